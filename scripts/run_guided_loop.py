@@ -44,6 +44,21 @@ def parse_args() -> argparse.Namespace:
         default=3,
         help="Additional refinement iterations to allow after each critique",
     )
+    parser.add_argument(
+        "--diagnose-model",
+        default=None,
+        help="Optional smaller model for the Diagnose phase (defaults to --model)",
+    )
+    parser.add_argument(
+        "--propose-model",
+        default=None,
+        help="Optional smaller model for the Propose phase (defaults to --model)",
+    )
+    parser.add_argument(
+        "--keep-alive",
+        default=None,
+        help="How long Ollama keeps the model loaded between calls (e.g. 30m); defaults to the server setting",
+    )
     return parser.parse_args()
 
 
@@ -66,7 +81,7 @@ def main() -> None:
         extra={"run_id": case_dir.parents[2].name if len(case_dir.parents) >= 2 else "unknown"},
         compile_command=manifest.get("compile_command"),
     )
-    client = OllamaLLMClient(model=args.model, temperature=args.temperature)
+    client = OllamaLLMClient(model=args.model, temperature=args.temperature, keep_alive=args.keep_alive)
     client.reset_usage()
     strategy = GuidedConvergenceStrategy(
         client=client,
@@ -75,6 +90,8 @@ def main() -> None:
             refine_sub_iterations=args.refine_iterations,
             interpreter_model=args.model,
             patch_model=args.model,
+            diagnose_model=args.diagnose_model,
+            propose_model=args.propose_model,
             temperature=args.temperature,
         ),
     )
@@ -5,7 +5,7 @@ import json
 import os
 import time
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Callable, Optional
 from urllib.error import HTTPError, URLError
 from urllib.request import Request, urlopen
 
@@ -76,8 +76,16 @@ def _call_ollama_with_stats(
     *,
     host: str | None = None,
     response_format: str | None = None,
+    keep_alive: str | None = None,
+    stop_when: Callable[[str], bool] | None = None,
 ) -> tuple[str, OllamaUsage]:
-    """Send a completion request to Ollama and return (response_text, usage)."""
+    """Send a completion request to Ollama and return (response_text, usage).
+
+    ``stop_when`` is checked against the accumulated text whenever a chunk ends
+    a line; returning True closes the stream, which makes Ollama stop generating.
+    The text is kept as one running string, so each check costs only what the
+    predicate itself reads.
+    """
 
     resolved_host = (host or os.environ.get("OLLAMA_HOST", "http://localhost:11434")).rstrip("/")
     url = f"{resolved_host}/api/generate"
@@ -91,12 +99,18 @@ def _call_ollama_with_stats(
         # Ollama supports JSON mode via "format": "json".
         # See: https://github.com/ollama/ollama/blob/main/docs/api.md (generate)
         payload["format"] = response_format
+    if keep_alive:
+        # Keep the model loaded between calls so back-to-back phases (and
+        # concurrent loops sharing one server) do not pay the weight load again.
+        payload["keep_alive"] = keep_alive
     request = Request(url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"})
 
     chunks: list[str] = []
+    streamed = ""
     usage = OllamaUsage(requests=1)
     start = time.perf_counter()
     done_payload: dict[str, object] | None = None
+    stopped_early = False
     try:
         with urlopen(request) as response:  # noqa: S310 - trusted local endpoint
             for raw_line in response:
@@ -111,6 +125,13 @@ def _call_ollama_with_stats(
                     chunks.append(str(chunk))
                 if isinstance(data, dict) and data.get("done"):
                     break
+                if stop_when is not None and chunk:
+                    # Appending in place keeps this linear overall, unlike
+                    # re-joining every chunk for each check.
+                    streamed += chunks[-1]
+                    if "\n" in chunks[-1] and stop_when(streamed):
+                        stopped_early = True
+                        break
     except (HTTPError, URLError) as err:  # pragma: no cover - thin transport shim
         raise OllamaError(f"Failed to contact Ollama at {url}: {err}") from err
     finally:
@@ -136,6 +157,10 @@ def _call_ollama_with_stats(
             total_s = eval_s + prompt_eval_s if (eval_s or prompt_eval_s) else None
         if total_s is not None:
             usage.total_duration_s = max(0.0, float(total_s))
+    if stopped_early and not usage.completion_tokens:
+        # Closing the stream skips the final done=true stats object. Each streamed
+        # chunk carries one generated token, so count those instead.
+        usage.completion_tokens = len(chunks)
 
     return "".join(chunks).strip(), usage
 
@@ -147,6 +172,7 @@ def call_ollama(
     *,
     host: str | None = None,
     response_format: str | None = None,
+    keep_alive: str | None = None,
 ) -> str:
     """Send a completion request to Ollama and return the concatenated response."""
 
@@ -156,6 +182,7 @@ def call_ollama(
         temperature,
         host=host,
         response_format=response_format,
+        keep_alive=keep_alive,
     )
     return text
 
@@ -167,6 +194,8 @@ class OllamaLLMClient:
     model: str
     temperature: float = 0.0
     host: Optional[str] = None
+    # Forwarded as Ollama's "keep_alive" (e.g. "30m"); None uses the server default.
+    keep_alive: Optional[str] = None
 
     # Accumulated usage for the lifetime of this client instance.
     usage: OllamaUsage = field(default_factory=OllamaUsage)
@@ -184,6 +213,7 @@ class OllamaLLMClient:
         temperature: float | None = None,
         model: str | None = None,
         response_format: str | None = None,
+        stop_when: Callable[[str], bool] | None = None,
     ) -> str:
         effective_model = model or self.model
         effective_temperature = self.temperature if temperature is None else temperature
@@ -194,6 +224,8 @@ class OllamaLLMClient:
             effective_temperature,
             host=self.host,
             response_format=response_format,
+            keep_alive=self.keep_alive,
+            stop_when=stop_when,
         )
 
         # Accumulate best-effort stats.
@@ -2,7 +2,7 @@
 Fuzzy matching functionality for finding code contexts.
 """
 
-from typing import List, Optional
+from typing import Iterator, List, Optional, Sequence
 import difflib
 
 
@@ -25,12 +25,12 @@ class FuzzyMatcher:
             raise ValueError("threshold must be between 0 and 1")
         self.threshold = threshold
 
-    def find_best_match(self, source_lines: List[str], pattern_lines: List[str]) -> Optional[int]:
+    def find_best_match(self, source_lines: Sequence[str], pattern_lines: List[str]) -> Optional[int]:
         """
         Find the best matching location for pattern_lines within source_lines.
 
         Args:
-            source_lines: List of lines to search within.
+            source_lines: Lines to search within.
             pattern_lines: List of lines to search for.
 
         Returns:
@@ -43,11 +43,38 @@ class FuzzyMatcher:
         pattern_len = len(pattern_lines)
         best_ratio = 0.0
         best_index = None
+        pattern_text = self._normalize_text("\n".join(pattern_lines))
+
+        def windows() -> Iterator[str]:
+            for i in range(len(source_lines) - pattern_len + 1):
+                yield self._normalize_text("\n".join(source_lines[i : i + pattern_len]))
+
+        # A ratio of 1.0 means the normalised texts are equal, and nothing beats
+        # the first such window; find it without any sequence matching.
+        for i, candidate_text in enumerate(windows()):
+            if candidate_text == pattern_text:
+                return i
+
+        # ratio() is not symmetric (autojunk only applies to the second sequence),
+        # so it keeps _calculate_similarity's order: pattern first, window second,
+        # which rebuilds the window index each time. The quick_ratio() upper bound
+        # is symmetric, so that matcher holds the pattern as its second sequence
+        # and reuses the pattern's character counts for every window.
+        matcher = difflib.SequenceMatcher(None, pattern_text, "")
+        bound = difflib.SequenceMatcher(None, "", pattern_text)
 
         # Slide the pattern across the source
-        for i in range(len(source_lines) - pattern_len + 1):
-            candidate = source_lines[i : i + pattern_len]
-            ratio = self._calculate_similarity(pattern_lines, candidate)
+        for i, candidate_text in enumerate(windows()):
+            bound.set_seq1(candidate_text)
+
+            # real_quick_ratio() and quick_ratio() are cheap upper bounds on
+            # ratio(); skip windows that cannot beat the best match so far.
+            if not self._may_improve(bound.real_quick_ratio(), best_ratio):
+                continue
+            if not self._may_improve(bound.quick_ratio(), best_ratio):
+                continue
+            matcher.set_seq2(candidate_text)
+            ratio = matcher.ratio()
 
             if ratio > best_ratio and ratio >= self.threshold:
                 best_ratio = ratio
@@ -55,6 +82,9 @@ class FuzzyMatcher:
 
         return best_index
 
+    def _may_improve(self, upper_bound: float, best_ratio: float) -> bool:
+        return upper_bound > best_ratio and upper_bound >= self.threshold
+
     def _calculate_similarity(self, lines1: List[str], lines2: List[str]) -> float:
         """
         Calculate similarity ratio between two lists of lines.
@@ -77,6 +77,10 @@ def unwrap_fenced_block(text: str, *, fence_markers: Sequence[str] = ("```", "~~
     stripped = text.strip()
     if not stripped:
         return UnwrappedFence(content=stripped)
+    # No leading whitespace is left, so only a text opening with a fence marker
+    # can have a fence as its first line; skip splitting plain responses.
+    if not stripped.startswith(tuple(fence_markers)):
+        return UnwrappedFence(content=stripped)
 
     lines = stripped.splitlines()
     if not lines:
@@ -4,7 +4,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 import re
-from typing import List, Optional, Sequence, Tuple
+from typing import Iterator, List, Optional, Sequence, Tuple
 
 from .fuzzy_matcher import FuzzyMatcher
 from .markdown import is_fence_line
@@ -74,7 +74,7 @@ class PatchApplier:
         return result_text, True
 
     # ------------------------------------------------------------------
-    def find_context(self, source_lines: List[str], context_lines: List[str]) -> Optional[int]:
+    def find_context(self, source_lines: Sequence[str], context_lines: List[str]) -> Optional[int]:
         return self.fuzzy_matcher.find_best_match(source_lines, context_lines)
 
     # ------------------------------------------------------------------
@@ -215,9 +215,9 @@ class PatchApplier:
     def _parse_replacement_blocks(self, patch: str) -> List[ParsedHunk]:
         hunks: List[ParsedHunk] = []
         text = patch.strip()
-        for match in REPLACEMENT_BLOCK_RE.finditer(text):
-            original_lines = self._block_to_lines(match.group("original"))
-            updated_lines = self._block_to_lines(match.group("updated"))
+        for original, updated in scan_replacement_blocks(text):
+            original_lines = self._block_to_lines(original)
+            updated_lines = self._block_to_lines(updated)
             hunks.append(
                 ParsedHunk(
                     original_lines=original_lines,
@@ -231,9 +231,93 @@ class PatchApplier:
         return normalize_replacement_block(block)
 
 
+_ORIGINAL_HEADER = "ORIGINAL LINES:"
+_UPDATED_HEADERS = ("\nCHANGED LINES:", "\nNEW LINES:")
+_NEXT_BLOCK = "\nORIGINAL LINES:"
+
+
+def scan_replacement_blocks(text: str, end: Optional[int] = None) -> Iterator[tuple[str, str]]:
+    """Yield raw (original, updated) bodies exactly as REPLACEMENT_BLOCK_RE would.
+
+    A ``str.find`` walk over the headers; no regex engine or backtracking on the
+    block bodies. Kept match-for-match with ``REPLACEMENT_BLOCK_RE.finditer``
+    run on ``text[:end]``, without making that copy.
+    """
+
+    if end is None:
+        end = len(text)
+    pos = 0
+    # Last (searched_from, found_at) per CHANGED/NEW header, so a header style the
+    # response never uses is not re-searched to the end of the text per block.
+    next_updated: dict[str, tuple[int, int]] = {}
+    while True:
+        header = text.find(_ORIGINAL_HEADER, pos, end)
+        if header < 0:
+            return
+        matched = None
+        # ``\s*\n`` prefers the last newline of the whitespace run and only
+        # falls back to earlier ones when no CHANGED/NEW header follows.
+        for original_start in _header_body_starts(text, header + len(_ORIGINAL_HEADER), end):
+            found = _find_updated_header(text, original_start, end, next_updated)
+            if found is not None:
+                matched = (original_start, *found)
+                break
+        if matched is None:
+            pos = header + 1
+            continue
+        original_start, original_end, updated_start = matched
+        updated_end = text.find(_NEXT_BLOCK, updated_start, end)
+        if updated_end < 0:
+            updated_end = end
+        yield text[original_start:original_end], text[updated_start:updated_end]
+        pos = updated_end
+
+
+def _header_body_starts(text: str, start: int, limit: int) -> Iterator[int]:
+    end = start
+    while end < limit and text[end].isspace():
+        end += 1
+    newline = text.rfind("\n", start, end)
+    while newline >= 0:
+        yield newline + 1
+        newline = text.rfind("\n", start, newline)
+
+
+def _find_updated_header(
+    text: str,
+    start: int,
+    end: int,
+    next_updated: dict[str, tuple[int, int]],
+) -> Optional[tuple[int, int]]:
+    pos = start
+    while True:
+        best = -1
+        best_header = ""
+        for candidate in _UPDATED_HEADERS:
+            searched_from, index = next_updated.get(candidate, (-1, -1))
+            # Reusable only if that search started at/before pos and found nothing
+            # in between (either no match at all, or the match is still ahead).
+            if searched_from < 0 or searched_from > pos or 0 <= index < pos:
+                index = text.find(candidate, pos, end)
+                next_updated[candidate] = (pos, index)
+            if index >= 0 and (best < 0 or index < best):
+                best, best_header = index, candidate
+        if best < 0:
+            return None
+        body_start = next(_header_body_starts(text, best + len(best_header), end), None)
+        if body_start is not None:
+            return best, body_start
+        pos = best + 1
+
+
 def _strip_numbered_prefix(line: str) -> str:
     if not line:
         return line
+    # Both prefix patterns need a digit after optional whitespace; most code lines
+    # fail that check, so skip the regexes for them.
+    leading = line.lstrip()
+    if not leading or not leading[0].isdecimal():
+        return line
     match = LINE_NUMBER_PIPE_RE.match(line)
     if match:
         return match.group("content")
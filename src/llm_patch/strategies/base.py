@@ -10,7 +10,7 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
-from typing import Any, Dict, List, Mapping, MutableMapping, Optional, Protocol
+from typing import Any, Dict, List, Mapping, MutableMapping, Optional, Protocol, Sequence
 
 
 class StrategyEventKind(str, Enum):
@@ -88,6 +88,13 @@ class PatchStrategy:
             return
         self._observer.notify(event)
 
+    def emit_many(self, events: Sequence[StrategyEvent]) -> None:
+        observer = self._observer
+        if observer is None:
+            return
+        for event in events:
+            observer.notify(event)
+
     def _event(
         self,
         *,
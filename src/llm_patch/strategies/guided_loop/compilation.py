@@ -6,38 +6,51 @@ Critique phase so the main controller can focus on orchestration.
 
 from __future__ import annotations
 
+import hashlib
+import locale
+import os
+import signal
 import subprocess
 import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Sequence
+from typing import IO, Any, Dict, List, Optional, Sequence, Tuple
 
 from .models import GuidedLoopInputs
 
 
-def run_compile(request: GuidedLoopInputs, patched_text: str) -> Dict[str, Any]:
+def run_compile(
+    request: GuidedLoopInputs,
+    patched_text: str,
+    *,
+    timeout: Optional[float] = None,
+    output_limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Compile ``patched_text`` in a scratch directory; returns a fresh dict the caller owns."""
+
     command = list(request.compile_command or [])
     if not command:
         return {"command": [], "returncode": None, "stdout": "", "stderr": ""}
     try:
         with tempfile.TemporaryDirectory(prefix="llm_patch_guided_") as tmpdir:
             tmp_path = Path(tmpdir)
-            for rel_path in compile_target_paths(request, command):
-                destination = tmp_path / rel_path
-                destination.parent.mkdir(parents=True, exist_ok=True)
-                destination.write_text(patched_text, encoding="utf-8")
-            proc = subprocess.run(
-                command,
-                cwd=str(tmp_path),
-                capture_output=True,
-                text=True,
-                check=False,
-            )
+            write_patched_targets(tmp_path, compile_target_paths(request, command), patched_text)
+            returncode, stdout, stderr = _run_captured(command, tmp_path, timeout, output_limit)
             return {
                 "command": command,
-                "returncode": proc.returncode,
-                "stdout": proc.stdout,
-                "stderr": proc.stderr,
+                "returncode": returncode,
+                "stdout": stdout,
+                "stderr": stderr,
             }
+    except subprocess.TimeoutExpired as exc:
+        return {
+            "command": command,
+            "returncode": None,
+            "stdout": _decode_partial(exc.stdout),
+            "stderr": f"Compile command timed out after {timeout}s\n{_decode_partial(exc.stderr)}".rstrip(),
+        }
     except OSError as exc:  # pragma: no cover - defensive
         return {
             "command": command,
@@ -47,14 +60,194 @@ def run_compile(request: GuidedLoopInputs, patched_text: str) -> Dict[str, Any]:
         }
 
 
+def write_patched_targets(root: Path, rel_paths: Sequence[Path], patched_text: str) -> None:
+    """Materialise ``patched_text`` at every target path under ``root``.
+
+    The text is written once; further targets are hardlinked to the first file,
+    falling back to another write where links are unsupported.
+    """
+
+    canonical: Optional[Path] = None
+    for rel_path in rel_paths:
+        destination = root / rel_path
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        if canonical is not None:
+            try:
+                os.link(canonical, destination)
+                continue
+            except OSError:
+                pass
+        destination.write_text(patched_text, encoding="utf-8")
+        if canonical is None:
+            canonical = destination
+
+
+def _decode_output(data: bytes) -> str:
+    """Decode captured output the way ``subprocess.run(text=True)`` would."""
+
+    decoded = data.decode(locale.getpreferredencoding(False), errors="replace")
+    return decoded.replace("\r\n", "\n").replace("\r", "\n")
+
+
+@dataclass(slots=True)
+class _BoundedStream:
+    """Keeps the first ``limit`` bytes of a pipe (all of it when None) and counts the rest.
+
+    The head is kept rather than the tail: the guided loop feeds the first
+    diagnostic back to the model, and cascading errors follow it.
+    """
+
+    limit: Optional[int]
+    chunks: List[bytes] = field(default_factory=list)
+    kept: int = 0
+    dropped: int = 0
+
+    def drain(self, stream: IO[bytes]) -> None:
+        # Keep reading after the limit so the child never blocks on a full pipe.
+        try:
+            for chunk in iter(lambda: stream.read(65536), b""):
+                if self.limit is None:
+                    self.chunks.append(chunk)
+                    continue
+                room = self.limit - self.kept
+                if room > 0:
+                    self.chunks.append(chunk[:room])
+                    self.kept += min(room, len(chunk))
+                self.dropped += max(0, len(chunk) - max(room, 0))
+        except (OSError, ValueError):
+            # _run_captured closed the pipe under us; keep what was read.
+            pass
+        finally:
+            stream.close()
+
+    def text(self) -> str:
+        decoded = _decode_output(b"".join(self.chunks))
+        if self.dropped:
+            decoded += f"\n[... {self.dropped} more bytes of output truncated]"
+        return decoded
+
+
+# How long to wait for the reader threads once the process group is gone. Only a
+# descendant that left the group (setsid, daemonising build tools) can still hold
+# the pipes open after that.
+PIPE_DRAIN_GRACE_S = 2.0
+
+
+def _run_captured(
+    command: Sequence[str],
+    cwd: Path,
+    timeout: Optional[float],
+    limit: Optional[int],
+) -> Tuple[int, str, str]:
+    """``subprocess.run(capture_output=True, text=True)`` with optional per-stream byte caps.
+
+    Raises ``subprocess.TimeoutExpired`` carrying the partial output, like ``run``.
+    The command runs in its own session so a timeout kills the whole process
+    group (make, gradle and ``sh -c`` wrappers included), not just the direct child.
+    """
+
+    # Unbuffered pipes: closing a buffered reader would wait for the lock held by
+    # a reader thread blocked in read().
+    proc = subprocess.Popen(
+        command,
+        cwd=str(cwd),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        bufsize=0,
+        start_new_session=True,
+    )
+    stdout, stderr = proc.stdout, proc.stderr
+    if stdout is None or stderr is None:  # pragma: no cover - both are PIPE above
+        raise OSError("compile command started without output pipes")
+    pipes = (stdout, stderr)
+    streams = (_BoundedStream(limit), _BoundedStream(limit))
+    readers = [
+        threading.Thread(target=sink.drain, args=(pipe,), daemon=True)
+        for sink, pipe in zip(streams, pipes)
+    ]
+    for reader in readers:
+        reader.start()
+
+    def finish_readers() -> None:
+        for reader, pipe in zip(readers, pipes):
+            reader.join(PIPE_DRAIN_GRACE_S)
+            if reader.is_alive():
+                pipe.close()
+                reader.join(PIPE_DRAIN_GRACE_S)
+
+    try:
+        returncode = proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired as exc:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            proc.kill()
+        proc.wait()
+        finish_readers()
+        raise subprocess.TimeoutExpired(
+            command, exc.timeout, output=streams[0].text(), stderr=streams[1].text()
+        ) from None
+    finish_readers()
+    return returncode, streams[0].text(), streams[1].text()
+
+
+def _decode_partial(output: Any) -> str:
+    if isinstance(output, bytes):
+        return _decode_output(output)
+    return output or ""
+
+
+COMPILE_CACHE_SIZE = 32
+
+
+def run_compile_cached(
+    request: GuidedLoopInputs,
+    patched_text: str,
+    cache: "OrderedDict[str, Dict[str, Any]]",
+    *,
+    max_entries: int = COMPILE_CACHE_SIZE,
+    timeout: Optional[float] = None,
+    output_limit: Optional[int] = None,
+) -> Tuple[Dict[str, Any], bool]:
+    """Run ``run_compile`` unless this exact patched text was already compiled.
+
+    Refinements frequently reproduce a previous patch byte-for-byte; the compile
+    result is deterministic for identical input, so reuse it. Returns
+    ``(result, cache_hit)``; callers get a copy so the cached entry stays intact.
+    """
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("\0".join(request.compile_command or []).encode("utf-8"))
+    digest.update(b"\0\0")
+    digest.update(patched_text.encode("utf-8"))
+    key = digest.hexdigest()
+    cached = cache.get(key)
+    if cached is not None:
+        cache.move_to_end(key)
+        return dict(cached), True
+    result = run_compile(request, patched_text, timeout=timeout, output_limit=output_limit)
+    if result.get("returncode") is None:
+        # Timeouts and launch failures are not a property of the patch; retry them.
+        return result, False
+    cache[key] = dict(result)
+    while len(cache) > max_entries:
+        cache.popitem(last=False)
+    return result, False
+
+
 def compile_target_paths(request: GuidedLoopInputs, command: Sequence[str]) -> List[Path]:
     """Return the relative file paths that should contain the patched source."""
 
     source_suffix = Path(request.source_path.name).suffix.lower()
-    targets: List[Path] = []
+    # Insertion-ordered dict used as an ordered set.
+    targets: Dict[Path, None] = {}
     for token in command:
         if not token or token.startswith("-"):
             continue
+        # Cheap necessary condition before building a Path; most tokens of long
+        # compiler command lines (objects, include dirs) fail it.
+        if source_suffix and not token.rstrip("/\\.").lower().endswith(source_suffix):
+            continue
         candidate = Path(token)
         suffix = candidate.suffix.lower()
         if not suffix or (source_suffix and suffix != source_suffix):
@@ -63,8 +256,7 @@ def compile_target_paths(request: GuidedLoopInputs, command: Sequence[str]) -> L
             relative_candidate = Path(candidate.name)
         else:
             relative_candidate = candidate
-        if relative_candidate not in targets:
-            targets.append(relative_candidate)
+        targets.setdefault(relative_candidate, None)
     if not targets:
-        targets.append(Path(request.source_path.name))
-    return targets
+        return [Path(request.source_path.name)]
+    return list(targets)
@@ -2,11 +2,13 @@
 from __future__ import annotations
 
 import hashlib
+import inspect
 import json
 import re
 import shutil
 import subprocess
 import tempfile
+from collections import OrderedDict
 from textwrap import dedent
 from datetime import datetime, timezone
 from pathlib import Path
@@ -50,13 +52,22 @@ PATCH_EXAMPLE_DIFF = (
     "}\n"
 )
 
+UNUSUAL_LINE_BREAK_PATTERN = patching.UNUSUAL_LINE_BREAK_PATTERN
+
 REPLACEMENT_BLOCK_PATTERN = re.compile(
     r"ORIGINAL LINES:\s*\n(?P<original>.*?)\n(?:CHANGED|NEW) LINES:\s*\n(?P<updated>.*?)(?=(?:\nORIGINAL LINES:|\Z))",
     re.DOTALL,
 )
 
 from ..base import PatchRequest, PatchStrategy, StrategyEvent, StrategyEventKind
-from .models import GuidedLoopConfig, GuidedLoopInputs, GuidedLoopResult, IterationOutcome
+from .models import (
+    GuidedLoopConfig,
+    GuidedLoopInputs,
+    GuidedLoopResult,
+    IterationOutcome,
+    ReplacementBlock,
+    SourceView,
+)
 from .phases import (
     GuidedIterationArtifact,
     GuidedLoopTrace,
@@ -152,6 +163,46 @@ class GuidedConvergenceStrategy(PatchStrategy):
         ),
     }
 
+    # Same fragments, but the error + focused context lead every prompt that uses
+    # them. Those two blocks are identical across one iteration's phases, so a
+    # backend with prefix KV reuse (Ollama/llama.cpp, vLLM) only evaluates them once.
+    PREFIX_FIRST_PROMPT_TEMPLATES: Mapping[GuidedPhase, str] = {
+        **PROMPT_TEMPLATES,
+        GuidedPhase.DIAGNOSE: compose_prompt(
+            ERROR_FRAGMENT,
+            CONTEXT_FRAGMENT,
+            DIAGNOSE_INSTRUCTIONS_FRAGMENT,
+            HISTORY_FRAGMENT,
+            PRIOR_PATCH_FRAGMENT,
+            CRITIQUE_FRAGMENT,
+        ),
+        GuidedPhase.GATHER: compose_prompt(
+            ERROR_FRAGMENT,
+            CONTEXT_FRAGMENT,
+            GATHER_INSTRUCTIONS_FRAGMENT,
+            EXPERIMENT_SUMMARY_FRAGMENT,
+        ),
+        GuidedPhase.PROPOSE: compose_prompt(
+            ERROR_FRAGMENT,
+            CONTEXT_FRAGMENT,
+            PROPOSE_INSTRUCTIONS_FRAGMENT,
+            REFINEMENT_CONTEXT_FRAGMENT,
+            EXPERIMENT_SUMMARY_FRAGMENT,
+            GATHERED_CONTEXT_FRAGMENT,
+        ),
+        GuidedPhase.GENERATE_PATCH: compose_prompt(
+            ERROR_FRAGMENT,
+            CONTEXT_FRAGMENT,
+            GENERATE_PATCH_INSTRUCTIONS_FRAGMENT,
+            PROPOSAL_SUMMARY_FRAGMENT,
+            DIAGNOSIS_SUMMARY_FRAGMENT,
+            DIAGNOSIS_RATIONALE_FRAGMENT,
+            GATHERED_CONTEXT_FRAGMENT,
+            CONSTRAINTS_FRAGMENT,
+            EXAMPLE_REPLACEMENT_FRAGMENT,
+        ),
+    }
+
     POINTER_SUMMARY_LANGUAGES = error_processing.POINTER_SUMMARY_LANGUAGES
     ERROR_LINE_PATTERN = error_processing.ERROR_LINE_PATTERN
     WARNING_LINE_PATTERN = error_processing.WARNING_LINE_PATTERN
@@ -161,15 +212,60 @@ class GuidedConvergenceStrategy(PatchStrategy):
     CONTEXT_RADIUS = 5
     SUFFIX_COLLAPSE_MAX_LINES = 8
     SUFFIX_COLLAPSE_SIMILARITY = 0.97
-    GATHER_ALLOWED_CATEGORIES = {
-        "ENCLOSING_SCOPE",
-        "DECLARATION",
-        "IMPORTS_NAMESPACE",
-        "TYPE_CONTEXT",
-        "FILE_CONTEXT",
-        "USAGE_CONTEXT",
-    }
-    GATHER_ALLOWED_TARGET_KINDS = {"symbol", "type", "module", "unknown"}
+    GATHER_ALLOWED_CATEGORIES = frozenset(
+        {
+            "ENCLOSING_SCOPE",
+            "DECLARATION",
+            "IMPORTS_NAMESPACE",
+            "TYPE_CONTEXT",
+            "FILE_CONTEXT",
+            "USAGE_CONTEXT",
+        }
+    )
+    GATHER_ALLOWED_TARGET_KINDS = frozenset({"symbol", "type", "module", "unknown"})
+    OPTIONAL_COMPLETE_KWARGS = ("response_format", "stop_when")
+    # Phase specs are immutable, so build them once rather than per phase run.
+    DIAGNOSE_RUN_SPEC = phase_runner.PhaseRunSpec(
+        start_message="Starting Diagnose phase",
+        completed_message="Diagnose phase completed",
+        failed_message="Diagnose phase failed",
+        empty_failed_message="Diagnose phase failed: empty response",
+        exception_human_notes_prefix="Diagnose phase failed: ",
+        empty_human_notes="Diagnose phase returned an empty response.",
+        require_non_empty=True,
+        machine_check_key="diagnosis_text",
+    )
+    PLANNING_RUN_SPEC = phase_runner.PhaseRunSpec(
+        start_message="Starting Planning phase",
+        completed_message="Planning phase completed",
+        failed_message="Planning phase failed",
+        empty_failed_message="Planning phase failed: empty response",
+        exception_human_notes_prefix="Planning phase failed: ",
+        empty_human_notes="Planning phase returned an empty response.",
+        require_non_empty=True,
+        machine_check_key="planning_notes",
+        set_iteration_failure_reason_on_empty="empty-response",
+    )
+    PROPOSE_RUN_SPEC = phase_runner.PhaseRunSpec(
+        start_message="Starting Propose phase",
+        completed_message="Propose phase completed",
+        failed_message="Propose phase failed",
+        empty_failed_message="Propose phase failed: empty response",
+        exception_human_notes_prefix="Propose phase failed: ",
+        empty_human_notes="Proposal response was empty.",
+        require_non_empty=True,
+        machine_check_key="proposal",
+    )
+    GENERATE_PATCH_RUN_SPEC = phase_runner.PhaseRunSpec(
+        start_message="Starting Generate Patch phase",
+        completed_message="Generate Patch phase completed",
+        failed_message="Generate Patch phase failed",
+        empty_failed_message="Generate Patch phase failed: empty response",
+        exception_human_notes_prefix="Generate Patch phase failed: ",
+        empty_human_notes="Generate Patch phase returned an empty response.",
+        require_non_empty=False,
+        machine_check_key=None,
+    )
 
     def __init__(
         self,
@@ -185,11 +281,17 @@ class GuidedConvergenceStrategy(PatchStrategy):
         self._baseline_error_fingerprint: Optional[str] = None
         self._latest_diagnosis_output: Optional[str] = None
         self._critique_transcripts: list[str] = []
+        self._compile_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._fingerprint_cache: Dict[str, Optional[str]] = {}
+        # Optional complete() kwargs the client's signature accepts; read on first use.
+        self._supported_complete_kwargs: Optional[frozenset[str]] = None
 
     def run(self, request: PatchRequest) -> GuidedLoopResult:
         inputs = self._ensure_inputs(request)
         self._latest_diagnosis_output = None
         self._critique_transcripts = []
+        self._compile_cache = OrderedDict()
+        self._fingerprint_cache = {}
         baseline_source = inputs.raw_error_text or inputs.error_text
         self._baseline_error_fingerprint = self._error_fingerprint(baseline_source)
         trace = self._plan_trace(inputs)
@@ -344,8 +446,9 @@ class GuidedConvergenceStrategy(PatchStrategy):
         context_override: Optional[str] = None,
         extra: Optional[Mapping[str, str]] = None,
     ) -> str:
+        templates = self.PREFIX_FIRST_PROMPT_TEMPLATES if self._config.prefix_first_prompts else self.PROMPT_TEMPLATES
         return prompting.render_prompt(
-            templates=self.PROMPT_TEMPLATES,
+            templates=templates,
             phase=phase,
             request=request,
             detect_error_line=error_processing.detect_error_line,
@@ -374,8 +477,7 @@ class GuidedConvergenceStrategy(PatchStrategy):
         events: List[StrategyEvent] = []
         if iteration.kind == "refine":
             reset_events = self._reset_for_refinement(iteration)
-            for event in reset_events:
-                self.emit(event)
+            self.emit_many(reset_events)
             events.extend(reset_events)
         outcome: IterationOutcome | None = None
         continue_execution = True
@@ -439,16 +541,7 @@ class GuidedConvergenceStrategy(PatchStrategy):
     ) -> List[StrategyEvent]:
         if self._client is None:
             raise RuntimeError("GuidedConvergenceStrategy requires an LLM client to execute phases")
-        spec = phase_runner.PhaseRunSpec(
-            start_message="Starting Diagnose phase",
-            completed_message="Diagnose phase completed",
-            failed_message="Diagnose phase failed",
-            empty_failed_message="Diagnose phase failed: empty response",
-            exception_human_notes_prefix="Diagnose phase failed: ",
-            empty_human_notes="Diagnose phase returned an empty response.",
-            require_non_empty=True,
-            machine_check_key="diagnosis_text",
-        )
+        spec = self.DIAGNOSE_RUN_SPEC
         events, response_text = phase_runner.run_phase(
             artifact=artifact,
             iteration=iteration,
@@ -456,7 +549,7 @@ class GuidedConvergenceStrategy(PatchStrategy):
             complete=lambda: self._client.complete(
                 prompt=artifact.prompt,
                 temperature=self._config.temperature,
-                model=self._config.interpreter_model,
+                model=self._config.diagnose_model or self._config.interpreter_model,
             ),
             spec=spec,
             now=self._now,
@@ -476,17 +569,7 @@ class GuidedConvergenceStrategy(PatchStrategy):
     ) -> List[StrategyEvent]:
         if self._client is None:
             raise RuntimeError("GuidedConvergenceStrategy requires an LLM client to execute phases")
-        spec = phase_runner.PhaseRunSpec(
-            start_message="Starting Planning phase",
-            completed_message="Planning phase completed",
-            failed_message="Planning phase failed",
-            empty_failed_message="Planning phase failed: empty response",
-            exception_human_notes_prefix="Planning phase failed: ",
-            empty_human_notes="Planning phase returned an empty response.",
-            require_non_empty=True,
-            machine_check_key="planning_notes",
-            set_iteration_failure_reason_on_empty="empty-response",
-        )
+        spec = self.PLANNING_RUN_SPEC
         events, _ = phase_runner.run_phase(
             artifact=artifact,
             iteration=iteration,
@@ -518,11 +601,11 @@ class GuidedConvergenceStrategy(PatchStrategy):
             iteration=iteration,
             iteration_index=iteration_index,
             request=request,
-            complete=self._client.complete,
+            complete=self._complete_with_optional_kwargs,
             temperature=self._config.temperature,
             model=self._config.interpreter_model,
-            allowed_categories=sorted(self.GATHER_ALLOWED_CATEGORIES),
-            allowed_target_kinds=sorted(self.GATHER_ALLOWED_TARGET_KINDS),
+            allowed_categories=self.GATHER_ALLOWED_CATEGORIES,
+            allowed_target_kinds=self.GATHER_ALLOWED_TARGET_KINDS,
             focused_context_window=lambda: self._focused_context_window(request),
             find_phase_response=self._find_phase_response,
             coerce_string=self._coerce_string,
@@ -548,16 +631,7 @@ class GuidedConvergenceStrategy(PatchStrategy):
     ) -> List[StrategyEvent]:
         if self._client is None:
             raise RuntimeError("GuidedConvergenceStrategy requires an LLM client to execute phases")
-        spec = phase_runner.PhaseRunSpec(
-            start_message="Starting Propose phase",
-            completed_message="Propose phase completed",
-            failed_message="Propose phase failed",
-            empty_failed_message="Propose phase failed: empty response",
-            exception_human_notes_prefix="Propose phase failed: ",
-            empty_human_notes="Proposal response was empty.",
-            require_non_empty=True,
-            machine_check_key="proposal",
-        )
+        spec = self.PROPOSE_RUN_SPEC
         events, _ = phase_runner.run_phase(
             artifact=artifact,
             iteration=iteration,
@@ -565,7 +639,7 @@ class GuidedConvergenceStrategy(PatchStrategy):
             complete=lambda: self._client.complete(
                 prompt=artifact.prompt,
                 temperature=self._config.temperature,
-                model=self._config.patch_model,
+                model=self._config.propose_model or self._config.patch_model,
             ),
             spec=spec,
             now=self._now,
@@ -583,16 +657,7 @@ class GuidedConvergenceStrategy(PatchStrategy):
     ) -> List[StrategyEvent]:
         if self._client is None:
             raise RuntimeError("GuidedConvergenceStrategy requires an LLM client to execute phases")
-        spec = phase_runner.PhaseRunSpec(
-            start_message="Starting Generate Patch phase",
-            completed_message="Generate Patch phase completed",
-            failed_message="Generate Patch phase failed",
-            empty_failed_message="Generate Patch phase failed: empty response",
-            exception_human_notes_prefix="Generate Patch phase failed: ",
-            empty_human_notes="Generate Patch phase returned an empty response.",
-            require_non_empty=False,
-            machine_check_key=None,
-        )
+        spec = self.GENERATE_PATCH_RUN_SPEC
         events, response_text = phase_runner.run_phase(
             artifact=artifact,
             iteration=None,
@@ -609,9 +674,43 @@ class GuidedConvergenceStrategy(PatchStrategy):
             ensure_machine_checks=self._ensure_machine_checks_dict,
         )
         if response_text:
-            artifact.response = patching.strip_code_fences(response_text)
+            artifact.response = patching.strip_code_fences(
+                patching.drop_prose_after_fenced_bodies(response_text)
+            )
         return events
 
+    def _complete_with_optional_kwargs(self, **kwargs: Any) -> str:
+        """Call ``client.complete``, dropping optional kwargs the client cannot take.
+
+        Support is read once from the signature of ``client.complete``; a
+        TypeError raised while the client runs is a real error and propagates.
+        """
+
+        client = self._client
+        if client is None:
+            raise RuntimeError("GuidedConvergenceStrategy requires an LLM client to execute phases")
+        supported = self._supported_complete_kwargs
+        if supported is None:
+            supported = self._supported_complete_kwargs = self._complete_kwargs_supported_by(client)
+        for name in self.OPTIONAL_COMPLETE_KWARGS:
+            if name in kwargs and name not in supported:
+                del kwargs[name]
+        return client.complete(**kwargs)
+
+    def _complete_kwargs_supported_by(self, client: LLMClient) -> frozenset[str]:
+        try:
+            parameters = inspect.signature(client.complete).parameters.values()
+        except (TypeError, ValueError):
+            return frozenset()
+        if any(parameter.kind is inspect.Parameter.VAR_KEYWORD for parameter in parameters):
+            return frozenset(self.OPTIONAL_COMPLETE_KWARGS)
+        names = {
+            parameter.name
+            for parameter in parameters
+            if parameter.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+        }
+        return frozenset(name for name in self.OPTIONAL_COMPLETE_KWARGS if name in names)
+
     def _execute_critique(
         self,
         artifact: PhaseArtifact,
@@ -631,7 +730,7 @@ class GuidedConvergenceStrategy(PatchStrategy):
             make_event=self._event,
             emit=self.emit,
             summarize_diff=self._summarize_diff,
-            critique_snippet=lambda text, span, **kwargs: self._critique_snippet(text, span, **kwargs),
+            critique_snippet=self._critique_snippet,
             focused_context_window=lambda req: self._focused_context_window(req),
             find_phase_response=self._find_phase_response,
             coerce_string=self._coerce_string,
@@ -645,6 +744,9 @@ class GuidedConvergenceStrategy(PatchStrategy):
             context_radius=self.CONTEXT_RADIUS,
             suffix_collapse_max_lines=self.SUFFIX_COLLAPSE_MAX_LINES,
             suffix_collapse_similarity=self.SUFFIX_COLLAPSE_SIMILARITY,
+            compile_cache=self._compile_cache,
+            compile_timeout=self._config.compile_timeout,
+            compile_output_limit=self._config.compile_output_limit,
         )
 
     @staticmethod
@@ -756,9 +858,8 @@ class GuidedConvergenceStrategy(PatchStrategy):
         return evaluation.ensure_machine_checks_dict(artifact)
 
 
-    @staticmethod
-    def _error_fingerprint(text: Optional[str]) -> Optional[str]:
-        return evaluation.error_fingerprint(text)
+    def _error_fingerprint(self, text: Optional[str]) -> Optional[str]:
+        return evaluation.error_fingerprint(text, self._fingerprint_cache)
 
     @staticmethod
     def _diagnosis_placeholder() -> str:
@@ -840,8 +941,9 @@ class GuidedConvergenceStrategy(PatchStrategy):
         *,
         radius: int = 5,
         fallback: str,
+        view: Optional[SourceView] = None,
     ) -> str:
-        return prompting.critique_snippet(text, span, radius=radius, fallback=fallback)
+        return prompting.critique_snippet(text, span, radius=radius, fallback=fallback, view=view)
 
     def _build_critique_prompt(
         self,
@@ -864,6 +966,7 @@ class GuidedConvergenceStrategy(PatchStrategy):
             after_snippet=after_snippet,
             diff_text=diff_text,
             validation_summary=validation_summary,
+            stable_first=self._config.prefix_first_prompts,
         )
 
     def _finalize_critique_response(
@@ -944,13 +1047,13 @@ class GuidedConvergenceStrategy(PatchStrategy):
 
     # ------------------------------------------------------------------
     # Compatibility shims for tests / migration-only refactor.
-    def _parse_replacement_blocks(self, diff_text: str) -> List[tuple[List[str], List[str]]]:
+    def _parse_replacement_blocks(self, diff_text: str) -> List[ReplacementBlock]:
         return patching.parse_replacement_blocks(diff_text)
 
     def _apply_three_way_blocks(
         self,
         request: GuidedLoopInputs,
-        replacement_blocks: List[tuple[List[str], List[str]]],
+        replacement_blocks: Sequence[ReplacementBlock],
     ) -> tuple[Optional[str], bool, str, tuple[tuple[int, int] | None, tuple[int, int] | None] | None]:
         return patching.apply_three_way_blocks(
             request,
@@ -965,11 +1068,38 @@ class GuidedConvergenceStrategy(PatchStrategy):
 
     # ------------------------------------------------------------------
     @staticmethod
-    def _summarize_diff(diff_text: str) -> Dict[str, Any]:
+    def _summarize_diff(
+        diff_text: str,
+        blocks: Optional[Sequence[ReplacementBlock]] = None,
+    ) -> Dict[str, Any]:
         if "ORIGINAL LINES:" in diff_text and (
             "NEW LINES:" in diff_text or "CHANGED LINES:" in diff_text
         ):
-            return GuidedConvergenceStrategy._summarize_replacement_blocks(diff_text)
+            return GuidedConvergenceStrategy._summarize_replacement_blocks(diff_text, blocks)
+        if UNUSUAL_LINE_BREAK_PATTERN.search(diff_text):
+            added, removed, hunks = GuidedConvergenceStrategy._count_diff_lines(diff_text)
+        else:
+            # Every line but the first starts right after a "\n", so counting
+            # "\n+" (minus the "\n+++" file headers it also matches) counts added
+            # lines without splitting; the first line is checked separately.
+            added = diff_text.count("\n+") - diff_text.count("\n+++")
+            removed = diff_text.count("\n-") - diff_text.count("\n---")
+            hunks = diff_text.count("\n@@")
+            if diff_text.startswith("@@"):
+                hunks += 1
+            elif diff_text.startswith("+") and not diff_text.startswith("+++"):
+                added += 1
+            elif diff_text.startswith("-") and not diff_text.startswith("---"):
+                removed += 1
+        return {
+            "added_lines": added,
+            "removed_lines": removed,
+            "hunks": hunks,
+            "delete_only": added == 0 and removed > 0,
+        }
+
+    @staticmethod
+    def _count_diff_lines(diff_text: str) -> tuple[int, int, int]:
         added = 0
         removed = 0
         hunks = 0
@@ -983,19 +1113,18 @@ class GuidedConvergenceStrategy(PatchStrategy):
                 added += 1
             elif line.startswith("-"):
                 removed += 1
-        return {
-            "added_lines": added,
-            "removed_lines": removed,
-            "hunks": hunks,
-            "delete_only": added == 0 and removed > 0,
-        }
+        return added, removed, hunks
 
     @staticmethod
-    def _summarize_replacement_blocks(diff_text: str) -> Dict[str, Any]:
-        blocks = patching.parse_replacement_blocks(diff_text)
+    def _summarize_replacement_blocks(
+        diff_text: str,
+        blocks: Optional[Sequence[ReplacementBlock]] = None,
+    ) -> Dict[str, Any]:
+        if blocks is None:
+            blocks = patching.parse_replacement_blocks(diff_text)
         hunks = len(blocks)
-        added = sum(len(updated) for _, updated in blocks)
-        removed = sum(len(original) for original, _ in blocks)
+        added = sum(len(block.updated) for block in blocks)
+        removed = sum(len(block.original) for block in blocks)
         return {
             "added_lines": added,
             "removed_lines": removed,
@@ -15,26 +15,41 @@ model invocation; those are injected as callbacks.
 
 from __future__ import annotations
 
-from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Mapping, Optional, Protocol, Sequence, Tuple
 
 from ..base import StrategyEvent, StrategyEventKind
-from .compilation import run_compile
+from .compilation import run_compile, run_compile_cached
 from . import patching
 from .phases import GuidedIterationArtifact, GuidedPhase, PhaseArtifact, PhaseStatus
-from .models import IterationOutcome
+from .models import IterationOutcome, ReplacementBlock, SourceView
 
 
 NowFn = Callable[[], str]
 EmitFn = Callable[[StrategyEvent], None]
 MakeEventFn = Callable[..., StrategyEvent]
-SummarizeDiffFn = Callable[[str], Dict[str, Any]]
-CritiqueSnippetFn = Callable[[Optional[str], Tuple[int, int] | None, Any], str]
+SummarizeDiffFn = Callable[[str, Optional[Sequence[ReplacementBlock]]], Dict[str, Any]]
 FocusedContextWindowFn = Callable[[Any], str]
 FindPhaseResponseFn = Callable[[GuidedIterationArtifact, GuidedPhase], Optional[str]]
 CoerceStringFn = Callable[[Any], Optional[str]]
 DetectErrorLineFn = Callable[[str, str], Optional[int]]
 ErrorFingerprintFn = Callable[[Optional[str]], Optional[str]]
 
+
+class CritiqueSnippetFn(Protocol):
+    """Signature of ``prompting.critique_snippet``."""
+
+    def __call__(
+        self,
+        text: Optional[str],
+        span: Tuple[int, int] | None,
+        *,
+        radius: int = ...,
+        fallback: str,
+        view: Optional[SourceView] = ...,
+    ) -> str: ...
+
+
 FinalizeCritiqueResponseFn = Callable[
     [
         PhaseArtifact,
@@ -71,6 +86,9 @@ def execute_critique(
     context_radius: int = 5,
     suffix_collapse_max_lines: int = 8,
     suffix_collapse_similarity: float = 0.97,
+    compile_cache: "OrderedDict[str, Dict[str, Any]] | None" = None,
+    compile_timeout: Optional[float] = None,
+    compile_output_limit: Optional[int] = None,
 ) -> tuple[List[StrategyEvent], IterationOutcome | None]:
     """Run the Critique phase.
 
@@ -116,8 +134,9 @@ def execute_critique(
             critique_feedback=artifact.response or artifact.human_notes,
         )
 
-    diff_stats = summarize_diff(diff_text)
+    # Parse once; the summary, span mapping and patch application all reuse it.
     replacement_blocks = patching.parse_replacement_blocks(diff_text)
+    diff_stats = summarize_diff(diff_text, replacement_blocks)
     artifact.machine_checks = {
         "diffStats": diff_stats,
     }
@@ -136,11 +155,14 @@ def execute_critique(
         diff_text,
         source_text=request.source_text,
         patch_applier=patch_applier,
+        blocks=replacement_blocks,
+        view=request.source_view(),
     )
     before_snippet = critique_snippet(
         request.source_text,
         pre_span,
         fallback=focused_context_window(request),
+        view=request.source_view(),
     )
 
     outcome = IterationOutcome(diff_text=diff_text, critique_feedback=artifact.response)
@@ -235,9 +257,25 @@ def execute_critique(
 
     compile_result = None
     compile_command = getattr(request, "compile_command", None) or config_compile_command
-    if compile_check and compile_command:
-        compile_result = run_compile(request, patched_text)
-        artifact.machine_checks["compile"] = dict(compile_result)
+    if compile_check and compile_command and patched_text is not None:
+        if compile_cache is None:
+            compile_result = run_compile(
+                request,
+                patched_text,
+                timeout=compile_timeout,
+                output_limit=compile_output_limit,
+            )
+        else:
+            compile_result, cache_hit = run_compile_cached(
+                request,
+                patched_text,
+                compile_cache,
+                timeout=compile_timeout,
+                output_limit=compile_output_limit,
+            )
+            artifact.machine_checks["compileCacheHit"] = cache_hit
+        # Both compile helpers hand back a dict the caller owns; no copy needed.
+        artifact.machine_checks["compile"] = compile_result
         outcome.compile_returncode = compile_result.get("returncode")
         outcome.compile_stdout = compile_result.get("stdout")
         outcome.compile_stderr = compile_result.get("stderr")
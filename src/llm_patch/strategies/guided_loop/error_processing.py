@@ -7,43 +7,70 @@ previously embedded in `controller.py`.
 from __future__ import annotations
 
 import re
-from typing import Mapping, Match, Optional, Sequence
+from functools import lru_cache
+from typing import Dict, Iterator, List, Mapping, Match, Optional, Pattern, Sequence, Tuple
 
 
 POINTER_SUMMARY_LANGUAGES = {"java", "c"}
 ERROR_LINE_PATTERN = re.compile(r"\berror\s*:", re.IGNORECASE)
 WARNING_LINE_PATTERN = re.compile(r"\bwarning\s*:", re.IGNORECASE)
 NOTE_LINE_PATTERN = re.compile(r"\bnote\s*:", re.IGNORECASE)
+# Any of the three diagnostic headers above, in a single search.
+DIAGNOSTIC_LINE_PATTERN = re.compile(r"\b(?:error|warning|note)\s*:", re.IGNORECASE)
 POINTER_ALLOWED_CHARS = frozenset({"^", "~", "|", "│"})
+POINTER_STRIP_TABLE = str.maketrans(dict.fromkeys(POINTER_ALLOWED_CHARS))
 TOKEN_PATTERN = re.compile(r"\"(?:\\.|[^\"])*\"|'(?:\\.|[^'])*'|\w+|[^\s\w]", re.UNICODE)
+# TOKEN_PATTERN without the backtracking string bodies; see scan_tokens().
+TOKEN_START_PATTERN = re.compile(r"\w+|[^\s\w]")
+QUOTE_CHARS = frozenset({"\"", "'"})
+GENERIC_LINE_NUMBER_PATTERN = re.compile(r":(\d+):")
+KEYWORD_LINE_NUMBER_PATTERN = re.compile(r"line\s+(\d+)", re.IGNORECASE)
 
 
 def prepare_compile_error_text(error_text: Optional[str], language: Optional[str]) -> str:
     raw_text = error_text or ""
+    language_key = (language or "").lower()
+    if language_key not in POINTER_SUMMARY_LANGUAGES:
+        # isspace() stops at the first visible character; no stripped copy needed.
+        return "" if raw_text.isspace() else raw_text
     text = raw_text.strip()
     if not text:
         return ""
-    language_key = (language or "").lower()
-    if language_key not in POINTER_SUMMARY_LANGUAGES:
-        return raw_text
-    block = extract_first_error_block(text)
-    lines = block.splitlines() if block else text.splitlines()
+    all_lines = text.splitlines()
+    block_lines = first_error_block_lines(all_lines)
+    lines = strip_blank_edges(block_lines) if block_lines is not None else []
+    if not lines:
+        lines = all_lines
     summary = pointer_summary(lines, language_key)
-    cleaned_lines = trim_trailing_blanks(lines)
+    # Both sources of ``lines`` already begin and end on edge-stripped, non-blank
+    # lines, so a single join yields the final text.
     if summary:
-        cleaned_lines = cleaned_lines + ["", summary]
-    return "\n".join(cleaned_lines).strip()
+        lines.extend(("", summary))
+    return "\n".join(lines)
 
 
 def extract_first_error_block(error_text: str) -> str:
-    lines = error_text.splitlines()
+    block_lines = first_error_block_lines(error_text.splitlines())
+    if block_lines is None:
+        return error_text.strip()
+    return "\n".join(block_lines).strip()
+
+
+def first_error_block_lines(lines: Sequence[str]) -> Optional[list[str]]:
+    """Lines of the first error block, or None when no line looks like an error.
+
+    Works on already-split lines so callers that keep using the lines do not
+    have to join and re-split the block.
+    """
+
     start_idx = None
     for idx, line in enumerate(lines):
-        if ERROR_LINE_PATTERN.search(line):
+        # Every diagnostic header contains a colon; most context lines do not.
+        if ":" in line and ERROR_LINE_PATTERN.search(line):
             start_idx = idx
             break
     if start_idx is None:
-        return error_text.strip()
+        return None
     end_idx = error_block_end_index(lines, start_idx)
     prefix_lines: list[str] = []
     prefix_idx = start_idx - 1
@@ -56,27 +83,38 @@ def extract_first_error_block(error_text: str) -> str:
             prefix_idx -= 1
             continue
         break
-    block_lines = prefix_lines + lines[start_idx:end_idx]
+    block_lines = prefix_lines + list(lines[start_idx:end_idx])
     trimmed = trim_trailing_blanks(block_lines)
-    cleaned = strip_trailing_context_headers(trimmed)
-    return "\n".join(cleaned).strip()
+    return strip_trailing_context_headers(trimmed)
+
+
+def strip_blank_edges(lines: Sequence[str]) -> list[str]:
+    """Line-wise equivalent of ``"\n".join(lines).strip().splitlines()``."""
+
+    stripped = trim_trailing_blanks(lines)
+    if stripped:
+        stripped[0] = stripped[0].lstrip()
+        stripped[-1] = stripped[-1].rstrip()
+    return stripped
 
 
 def error_block_end_index(lines: Sequence[str], start_idx: int) -> int:
     for idx in range(start_idx + 1, len(lines)):
         line = lines[idx]
-        if ERROR_LINE_PATTERN.search(line) or is_warning_or_note_line(line):
+        if ":" in line and DIAGNOSTIC_LINE_PATTERN.search(line):
             return idx
     return len(lines)
 
 
 def trim_trailing_blanks(lines: Sequence[str]) -> list[str]:
-    trimmed = list(lines)
-    while trimmed and not trimmed[-1].strip():
-        trimmed.pop()
-    while trimmed and not trimmed[0].strip():
-        trimmed.pop(0)
-    return trimmed
+    # Index scan plus one slice; popping from the front is O(n) per blank line.
+    start = 0
+    end = len(lines)
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    while start < end and not lines[start].strip():
+        start += 1
+    return list(lines[start:end])
 
 
 def strip_trailing_context_headers(lines: Sequence[str]) -> list[str]:
@@ -87,6 +125,8 @@ def strip_trailing_context_headers(lines: Sequence[str]) -> list[str]:
 
 
 def is_warning_or_note_line(line: str) -> bool:
+    if ":" not in line:
+        return False
     return bool(WARNING_LINE_PATTERN.search(line) or NOTE_LINE_PATTERN.search(line))
 
 
@@ -102,17 +142,12 @@ def pointer_summary(lines: Sequence[str], language: Optional[str]) -> Optional[s
 
 
 def find_pointer_line(lines: Sequence[str]) -> Optional[int]:
-    allowed = POINTER_ALLOWED_CHARS
     for idx, line in enumerate(lines):
         if "^" not in line:
             continue
-        normalized = line.replace("│", "|")
-        stripped = normalized.strip()
-        if not stripped:
-            continue
-        filtered = "".join(ch for ch in stripped if not ch.isspace())
-        remainder = "".join(ch for ch in filtered if ch not in allowed)
-        if not remainder:
+        # A pointer line holds only marker characters and whitespace.
+        remainder = line.translate(POINTER_STRIP_TABLE)
+        if not remainder or remainder.isspace():
             return idx
     return None
 
@@ -148,33 +183,93 @@ def line_with_marker(code_line: str, caret_index: int, marker: str = " <ERROR> "
 
 
 def token_context_descriptions(code_line: str, caret_index: int) -> Mapping[str, str]:
-    tokens = list(TOKEN_PATTERN.finditer(code_line))
-    prev_match = None
-    current_match = None
-    next_match = None
-    for match in tokens:
-        start, end = match.span()
+    prev_token = None
+    current_token = None
+    next_token = None
+    # Stream the tokens: nothing past the first token after the caret is needed.
+    for start, end in scan_tokens(code_line):
         if end <= caret_index:
-            prev_match = match
+            prev_token = (start, end)
             continue
         if start <= caret_index < end:
-            current_match = match
+            current_token = (start, end)
             continue
         if start > caret_index:
-            next_match = match
+            next_token = (start, end)
             break
-    current_desc = describe_token(current_match, default="a whitespace column")
-    prev_desc = describe_token(prev_match, default="start of line")
-    next_desc = describe_token(next_match, default="end of line")
+
+    def token_text(span: Optional[Tuple[int, int]]) -> Optional[str]:
+        return code_line[span[0] : span[1]] if span else None
+
+    current_desc = describe_token_text(token_text(current_token), default="a whitespace column")
+    prev_desc = describe_token_text(token_text(prev_token), default="start of line")
+    next_desc = describe_token_text(token_text(next_token), default="end of line")
     return {"current": current_desc, "previous": prev_desc, "next": next_desc}
 
 
+def scan_tokens(code_line: str) -> Iterator[Tuple[int, int]]:
+    """Yield the spans ``TOKEN_PATTERN.finditer(code_line)`` would, in linear time.
+
+    The quoted-string branch of TOKEN_PATTERN is ambiguous on backslashes, so an
+    unterminated string full of them backtracks exponentially. Here each quote
+    type's outcome is computed once per position (see ``_quoted_string_ends``)
+    and everything else goes through the unambiguous TOKEN_START_PATTERN.
+    """
+
+    string_ends: Dict[str, List[int]] = {}
+    pos = 0
+    while True:
+        match = TOKEN_START_PATTERN.search(code_line, pos)
+        if match is None:
+            return
+        start, end = match.span()
+        quote = match.group()
+        if quote in QUOTE_CHARS:
+            ends = string_ends.get(quote)
+            if ends is None:
+                ends = string_ends[quote] = _quoted_string_ends(code_line, quote)
+            # A string that never closes falls back to the lone-symbol branch.
+            end = max(ends[start + 1], start + 1)
+        yield start, end
+        pos = end
+
+
+def _quoted_string_ends(text: str, quote: str) -> List[int]:
+    """End offsets of the match ``(?:\\.|[^q])*q`` would make from each position.
+
+    Mirrors the regex engine's backtracking order (another iteration first,
+    ``\\.`` before ``[^q]``, then the closing quote), which depends only on the
+    position, so a right-to-left pass decides every start at once. -1 means no
+    match.
+    """
+
+    length = len(text)
+    ends = [-1] * (length + 1)
+    for pos in range(length - 1, -1, -1):
+        char = text[pos]
+        end = -1
+        if char == "\\" and pos + 1 < length and text[pos + 1] != "\n":
+            end = ends[pos + 2]
+        if end < 0:
+            end = ends[pos + 1] if char != quote else pos + 1
+        ends[pos] = end
+    return ends
+
+
 def describe_token(match: Match[str] | None, *, default: str) -> str:
-    if match is None:
-        return default
-    token = match.group()
+    return describe_token_text(match.group() if match is not None else None, default=default)
+
+
+def describe_token_text(token: Optional[str], *, default: str) -> str:
     if not token:
         return default
+    # Quotes and ASCII punctuation decide the class from the first character alone;
+    # only word-like tokens need the full-string checks below.
+    first = token[0]
+    if first in "\"'":
+        return f"literal {token}"
+    if first.isascii() and not (first.isalnum() or first == "_"):
+        return f"symbol {token!r}"
     if token.isidentifier():
         return f"identifier {token!r}"
     if token.replace("_", "").isdigit():
@@ -198,59 +293,48 @@ def symbol_label(symbol: Optional[str], *, default: str) -> str:
     return f"U+{ord(symbol):04X}"
 
 
+@lru_cache(maxsize=256)
+def filename_line_number_pattern(filename: str) -> Pattern[str]:
+    return re.compile(rf"{re.escape(filename)}:(\d+)")
+
+
+@lru_cache(maxsize=256)
+def any_line_number_pattern(filename: str) -> Pattern[str]:
+    """Single alternation of the filename, generic and keyword line-number patterns.
+
+    Only answers "could anything match"; the individual patterns still decide
+    priority because the alternation returns the leftmost match, not the best one.
+    """
+
+    alternatives = [GENERIC_LINE_NUMBER_PATTERN.pattern, rf"(?i:{KEYWORD_LINE_NUMBER_PATTERN.pattern})"]
+    if filename:
+        alternatives.insert(0, filename_line_number_pattern(filename).pattern)
+    return re.compile("|".join(alternatives))
+
+
 def detect_error_line(error_text: str, filename: str) -> Optional[int]:
     if not error_text:
         return None
-    filename_pattern = re.compile(rf"{re.escape(filename)}:(\d+)") if filename else None
-    generic_pattern = re.compile(r":(\d+):")
-    keyword_pattern = re.compile(r"line\s+(\d+)", re.IGNORECASE)
-
-    def extract_number(line: str) -> Optional[int]:
-        match = filename_pattern.search(line) if filename_pattern else None
-        if match:
-            try:
-                return int(match.group(1))
-            except ValueError:  # pragma: no cover - defensive
-                return None
-        match = generic_pattern.search(line)
-        if match:
-            try:
-                return int(match.group(1))
-            except ValueError:  # pragma: no cover - defensive
-                return None
-        match = keyword_pattern.search(line)
-        if match:
-            try:
+    if any_line_number_pattern(filename or "").search(error_text) is None:
+        # Diagnostics without any line reference (e.g. from another tool) would
+        # otherwise be rescanned once per pattern below.
+        return None
+    # Highest priority first. Every pattern captures ``\d+``, which int() always
+    # accepts, so the first hit is the answer.
+    patterns: Tuple[Pattern[str], ...] = (GENERIC_LINE_NUMBER_PATTERN, KEYWORD_LINE_NUMBER_PATTERN)
+    if filename:
+        patterns = (filename_line_number_pattern(filename), *patterns)
+
+    def extract_number(text: str) -> Optional[int]:
+        for pattern in patterns:
+            match = pattern.search(text)
+            if match:
                 return int(match.group(1))
-            except ValueError:  # pragma: no cover - defensive
-                return None
         return None
 
-    lines = error_text.splitlines()
-    priority_lines = [
-        line for line in lines if ERROR_LINE_PATTERN.search(line) or WARNING_LINE_PATTERN.search(line)
-    ]
-    for line in priority_lines:
-        extracted = extract_number(line)
-        if extracted is not None:
-            return extracted
-
-    match = filename_pattern.search(error_text) if filename_pattern else None
-    if match:
-        try:
-            return int(match.group(1))
-        except ValueError:  # pragma: no cover - defensive
-            return None
-    generic = generic_pattern.search(error_text)
-    if generic:
-        try:
-            return int(generic.group(1))
-        except ValueError:  # pragma: no cover - defensive
-            return None
-    fallback = keyword_pattern.search(error_text)
-    if fallback:
-        try:
-            return int(fallback.group(1))
-        except ValueError:  # pragma: no cover - defensive
-            return None
-    return None
+    for line in error_text.splitlines():
+        if ":" in line and (ERROR_LINE_PATTERN.search(line) or WARNING_LINE_PATTERN.search(line)):
+            extracted = extract_number(line)
+            if extracted is not None:
+                return extracted
+    return extract_number(error_text)
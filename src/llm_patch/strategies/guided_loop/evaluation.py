@@ -13,7 +13,6 @@ It centralizes:
 from __future__ import annotations
 
 import hashlib
-import re
 from typing import Any, Dict, Optional, Tuple
 
 from .models import IterationOutcome
@@ -46,13 +45,37 @@ def record_iteration_telemetry(
         iteration.telemetry[key] = payload
 
 
-def error_fingerprint(text: Optional[str]) -> Optional[str]:
+def collapse_whitespace(text: str) -> str:
+    # Same result as re.sub(r"\s+", " ", text.strip()) (both use str.isspace
+    # semantics) but a single C-level split instead of a regex pass.
+    return " ".join(text.split())
+
+
+def error_fingerprint(
+    text: Optional[str], cache: Optional[Dict[str, Optional[str]]] = None
+) -> Optional[str]:
+    """Fingerprint ``text``, reusing ``cache`` when the caller scopes one.
+
+    Refinements often reproduce the same compiler output (compile-cache hits return
+    the very same strings), so a run-scoped cache skips repeat normalize + hash.
+    """
+
     if not text:
         return None
-    normalized = re.sub(r"\s+", " ", text.strip())
+    if cache is None:
+        return _fingerprint(text)
+    if text not in cache:
+        cache[text] = _fingerprint(text)
+    return cache[text]
+
+
+def _fingerprint(text: str) -> Optional[str]:
+    normalized = collapse_whitespace(text)
     if not normalized:
         return None
-    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    # Equality grouping only, no security requirement: BLAKE2b is stdlib and
+    # faster than SHA-256 on 64-bit hosts; 32 bytes keeps the 64-char hex form.
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=32).hexdigest()
 
 
 def stall_signature(outcome: IterationOutcome | None) -> Optional[Tuple[str, Optional[int], Tuple[int, int]]]:
@@ -62,13 +85,17 @@ def stall_signature(outcome: IterationOutcome | None) -> Optional[Tuple[str, Opt
         return None
     if not outcome.diff_span:
         return None
+    if outcome.stall_signature is not None:
+        return outcome.stall_signature
     message = outcome.error_message or outcome.compile_stderr or outcome.compile_stdout or outcome.error_fingerprint
     if not message:
         return None
-    normalized_message = re.sub(r"\s+", " ", message.strip())
+    normalized_message = collapse_whitespace(message)
     if not normalized_message:
         return None
-    return normalized_message, outcome.error_location, outcome.diff_span
+    # Each outcome is compared twice (as current, then as previous), so keep it.
+    outcome.stall_signature = (normalized_message, outcome.error_location, outcome.diff_span)
+    return outcome.stall_signature
 
 
 def detect_stall(
@@ -76,8 +103,10 @@ def detect_stall(
     current_outcome: IterationOutcome | None,
 ) -> Optional[Dict[str, Any]]:
     prev_signature = stall_signature(previous_outcome)
+    if not prev_signature:
+        return None
     curr_signature = stall_signature(current_outcome)
-    if not prev_signature or not curr_signature:
+    if not curr_signature:
         return None
     if prev_signature != curr_signature:
         return None
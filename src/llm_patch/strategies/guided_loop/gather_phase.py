@@ -12,7 +12,7 @@ Gather is specialized compared to other LLM-backed phases:
 
 from __future__ import annotations
 
-from typing import Any, Callable, Dict, List, Optional, Sequence
+from typing import AbstractSet, Any, Callable, Dict, List, Optional
 
 from ..base import StrategyEvent, StrategyEventKind
 from . import gathering
@@ -40,8 +40,8 @@ def execute_gather(
     complete: CompleteFn,
     temperature: float,
     model: Optional[str],
-    allowed_categories: Sequence[str],
-    allowed_target_kinds: Sequence[str],
+    allowed_categories: AbstractSet[str],
+    allowed_target_kinds: AbstractSet[str],
     focused_context_window: FocusedContextWindowFn,
     find_phase_response: FindPhaseResponseFn,
     coerce_string: CoerceStringFn,
@@ -116,8 +116,8 @@ def execute_gather(
         try:
             parsed = gathering.parse_gather_response(
                 response_text,
-                allowed_categories=set(allowed_categories),
-                allowed_target_kinds=set(allowed_target_kinds),
+                allowed_categories=allowed_categories,
+                allowed_target_kinds=allowed_target_kinds,
             )
             last_error = None
             break
@@ -133,12 +133,6 @@ def execute_gather(
     # restore original prompt so the trace remains stable
     artifact.prompt = base_prompt
     artifact.response = response_text
-    machine_checks = ensure_machine_checks(artifact)
-    machine_checks["gather"] = {
-        "attempts": attempts,
-        "parseError": last_error,
-    }
-
     if parsed is None:
         parsed = {"needs_more_context": False, "requests": []}
         artifact.human_notes = (
@@ -151,17 +145,31 @@ def execute_gather(
         planning_text=planning_text,
         context_window=focused_context_window(),
     )
-    machine_checks["gather"]["enforced"] = enforced_reason is not None
-    machine_checks["gather"]["enforcementReason"] = enforced_reason
-
-    machine_checks["gather_request"] = parsed
+    # Record the parse/enforcement outcome before collecting, so it is in the
+    # trace even if collection raises.
+    machine_checks = ensure_machine_checks(artifact)
+    machine_checks.update(
+        {
+            "gather": {
+                "attempts": attempts,
+                "parseError": last_error,
+                "enforced": enforced_reason is not None,
+                "enforcementReason": enforced_reason,
+            },
+            "gather_request": parsed,
+        }
+    )
     gathered_text, gathered_details = gathering.collect_gathered_context(
         request,
         parsed,
         detect_error_line=error_processing.detect_error_line,
     )
-    machine_checks["gathered_context_text"] = gathered_text
-    machine_checks["gathered_context"] = gathered_details
+    machine_checks.update(
+        {
+            "gathered_context_text": gathered_text,
+            "gathered_context": gathered_details,
+        }
+    )
     record_iteration_telemetry(
         iteration,
         "gather",
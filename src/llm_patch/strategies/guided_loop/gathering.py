@@ -13,9 +13,11 @@ this module focuses on:
 from __future__ import annotations
 
 import json
+import os
 import re
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Callable, Dict, Mapping, Optional, Sequence, Tuple
+from typing import AbstractSet, Any, Callable, Dict, Iterable, Mapping, Optional, Pattern, Sequence, Tuple
 
 from llm_patch.markdown import unwrap_fenced_block
 
@@ -108,17 +110,30 @@ def enforce_gather_structural_requirements(
     return gather_request, None
 
 
+# JSON keys are compared after dropping everything but [a-z0-9]. ASCII keys (the
+# norm) go through bytes.translate, a single C pass; the regex covers the rest.
+_NON_KEY_CHAR_RE = re.compile(r"[^a-z0-9]")
+_NON_KEY_ASCII_BYTES = bytes(code for code in range(128) if _NON_KEY_CHAR_RE.fullmatch(chr(code)))
+
+
+def _as_str_set(items: Iterable[str]) -> AbstractSet[str]:
+    # The controller passes frozensets that live for the whole run; reuse them.
+    if isinstance(items, frozenset):
+        return items
+    return frozenset(str(item) for item in items)
+
+
 def parse_gather_response(
     text: str,
     *,
-    allowed_categories: Sequence[str],
-    allowed_target_kinds: Sequence[str],
+    allowed_categories: Iterable[str],
+    allowed_target_kinds: Iterable[str],
 ) -> Dict[str, Any]:
     if not text:
         raise ValueError("empty response")
 
-    allowed_categories_set = {str(item) for item in allowed_categories}
-    allowed_target_kinds_set = {str(item) for item in allowed_target_kinds}
+    allowed_categories_set = _as_str_set(allowed_categories)
+    allowed_target_kinds_set = _as_str_set(allowed_target_kinds)
 
     def extract_first_json_object(raw: str) -> str:
         # Best-effort: if the model adds prose before/after, extract the first {...} block.
@@ -142,12 +157,12 @@ def parse_gather_response(
         raise ValueError("root must be a JSON object")
 
     def norm_key(key: str) -> str:
-        return re.sub(r"[^a-z0-9]", "", key.lower())
+        lowered = key.lower()
+        if lowered.isascii():
+            return lowered.encode("ascii").translate(None, _NON_KEY_ASCII_BYTES).decode("ascii")
+        return _NON_KEY_CHAR_RE.sub("", lowered)
 
-    normalized_payload: dict[str, Any] = {}
-    for key, value in payload.items():
-        if isinstance(key, str):
-            normalized_payload[norm_key(key)] = value
+    normalized_payload = {norm_key(key): value for key, value in payload.items() if isinstance(key, str)}
 
     needs = normalized_payload.get("needsmorecontext")
     why = normalized_payload.get("why")
@@ -166,10 +181,7 @@ def parse_gather_response(
     for idx, item in enumerate(requests):
         if not isinstance(item, dict):
             raise ValueError(f"requests[{idx}] must be an object")
-        item_norm: dict[str, Any] = {}
-        for key, value in item.items():
-            if isinstance(key, str):
-                item_norm[norm_key(key)] = value
+        item_norm = {norm_key(key): value for key, value in item.items() if isinstance(key, str)}
 
         category = item_norm.get("category")
         if isinstance(category, str):
@@ -186,10 +198,7 @@ def parse_gather_response(
         if target is not None:
             if not isinstance(target, dict):
                 raise ValueError(f"requests[{idx}].target must be object or null")
-            target_norm: dict[str, Any] = {}
-            for key, value in target.items():
-                if isinstance(key, str):
-                    target_norm[norm_key(key)] = value
+            target_norm = {norm_key(key): value for key, value in target.items() if isinstance(key, str)}
             kind = target_norm.get("kind")
             name = target_norm.get("name")
             if isinstance(kind, str):
@@ -201,7 +210,7 @@ def parse_gather_response(
             if not isinstance(name, str) or not name.strip():
                 raise ValueError(f"requests[{idx}].target.name must be a non-empty string")
             token = name.strip()
-            if any(ch.isspace() for ch in token):
+            if len(token.split()) > 1:
                 raise ValueError(f"requests[{idx}].target.name must be a single token")
             cleaned_target = {"kind": str(kind), "name": token}
 
@@ -220,6 +229,49 @@ def parse_gather_response(
     }
 
 
+@lru_cache(maxsize=256)
+def _declaration_pattern(token: str) -> Pattern[str]:
+    """Lines that look like they declare ``token``, as a single alternation."""
+
+    escaped = re.escape(token)
+    return re.compile(
+        rf"\b(?:class|struct|enum|interface)\s+{escaped}\b"
+        rf"|\bdef\s+{escaped}\b"
+        rf"|\bfunction\s+{escaped}\b"
+        rf"|\btypedef\b.*\b{escaped}\b"
+        rf"|\b{escaped}\s*\("
+    )
+
+
+# The "current token: identifier '...'" clause of prepare_compile_error_text's
+# pointer summary; repr() quoting means single quotes, double quotes as a fallback.
+_POINTER_TOKEN_PATTERNS = (
+    re.compile(r"current token:\s*identifier\s+'([^']+)'"),
+    re.compile(r"current token:\s*identifier\s+\"([^\"]+)\""),
+)
+
+
+def _format_numbered_lines(lines: Sequence[str], start: int, end: int, *, rstrip: bool = True) -> str:
+    """Render 1-based lines ``start..end`` (inclusive) as ``"   N | text"`` rows."""
+
+    block = "\n".join([f"{lineno:4d} | {line}" for lineno, line in enumerate(lines[start - 1 : end], start)])
+    return block.rstrip() if rstrip else block
+
+
+def _read_text_prefix(path: Path, max_chars: int) -> str:
+    """``path.read_text(encoding="utf-8", errors="replace")[:max_chars]`` without reading past it.
+
+    A UTF-8 character (or replaced invalid sequence) spans at most four bytes,
+    so ``4 * max_chars`` bytes always cover the first ``max_chars`` characters.
+    """
+
+    with path.open("rb") as handle:
+        raw = handle.read(4 * max_chars)
+    # Match read_text's universal-newline translation.
+    text = raw.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+    return text[:max_chars]
+
+
 def collect_gathered_context(
     request: GuidedLoopInputs,
     gather_request: Mapping[str, Any],
@@ -241,67 +293,122 @@ def collect_gathered_context(
             details["why"] = why.strip()
         return "", details
 
-    error_line = detect_error_line(request.error_text or "", request.source_path.name)
-    all_lines = request.source_text.splitlines()
+    error_line = request.error_line(detect_error_line, request.source_path.name)
+    # Each file is split at most once however many categories scan it.
+    split_cache: Dict[str, list[str]] = {}
+
+    def lines_of(text: str) -> list[str]:
+        lines = split_cache.get(text)
+        if lines is None:
+            lines = split_cache[text] = text.splitlines()
+        return lines
+
+    all_lines = lines_of(request.source_text)
     total_lines = len(all_lines)
 
     def numbered_window(start_line: int, end_line: int) -> str:
         start = max(1, start_line)
         end = min(total_lines, end_line)
-        window = []
-        for lineno in range(start, end + 1):
-            raw = all_lines[lineno - 1]
-            window.append(f"{lineno:4d} | {raw}")
-        return "\n".join(window).rstrip()
+        return _format_numbered_lines(all_lines, start, end)
 
     def numbered_window_for_text(text: str, *, center_line: int, radius: int) -> str:
-        lines = text.splitlines()
+        lines = lines_of(text)
         if not lines:
             return ""
         start = max(1, center_line - radius)
         end = min(len(lines), center_line + radius)
-        window: list[str] = []
-        for lineno in range(start, end + 1):
-            window.append(f"{lineno:4d} | {lines[lineno - 1]}")
-        return "\n".join(window).rstrip()
+        return _format_numbered_lines(lines, start, end)
+
+    def infer_token_from_error_text() -> Optional[str]:
+        # Prefer the enriched pointer summary inserted by prepare_compile_error_text().
+        text = request.error_text or ""
+        if not text:
+            return None
+        if "current token:" not in text:
+            return None
+        for pattern in _POINTER_TOKEN_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                candidate = match.group(1).strip()
+                if candidate and len(candidate.split()) == 1:
+                    return candidate
+        return None
+
+    # Determine token of interest (single token supported for now).
+    token: Optional[str] = None
+    for item in requests:
+        if not isinstance(item, Mapping):
+            continue
+        target = item.get("target")
+        if isinstance(target, Mapping):
+            name = target.get("name")
+            if isinstance(name, str) and name.strip():
+                token = name.strip()
+                break
+
+    if token is None:
+        token = infer_token_from_error_text()
+
+    requested_categories = {
+        item.get("category")
+        for item in requests
+        if isinstance(item, Mapping) and isinstance(item.get("category"), str)
+    }
 
     # Best-effort read of neighboring files for cross-file name resolution.
     other_files: list[tuple[str, str]] = []
-    if request.source_path and request.source_path.exists():
+    # Only the token searches look at other files; skip the I/O otherwise.
+    wants_other_files = bool(token) and not requested_categories.isdisjoint(
+        {"USAGE_CONTEXT", "DECLARATION", "TYPE_CONTEXT"}
+    )
+    if wants_other_files and request.source_path and request.source_path.exists():
         parent = request.source_path.parent
         ext = request.source_path.suffix.lower()
-        candidates: list[Path] = []
+        # Candidate suffixes in priority order; None scans every entry.
+        suffix_groups: Optional[Tuple[str, ...]]
         if ext in {".c", ".cc", ".cpp", ".cxx"}:
-            candidates.extend(sorted(parent.glob("*.h")))
-            candidates.extend(sorted(parent.glob(f"*{ext}")))
+            suffix_groups = (".h", ext)
         elif ext in {".py"}:
-            candidates.extend(sorted(parent.glob("*.py")))
+            suffix_groups = (".py",)
         elif ext in {".ts", ".tsx", ".js", ".jsx"}:
-            candidates.extend(sorted(parent.glob("*.ts")))
-            candidates.extend(sorted(parent.glob("*.tsx")))
-            candidates.extend(sorted(parent.glob("*.js")))
-            candidates.extend(sorted(parent.glob("*.jsx")))
+            suffix_groups = (".ts", ".tsx", ".js", ".jsx")
         elif ext in {".java"}:
-            candidates.extend(sorted(parent.glob("*.java")))
+            suffix_groups = (".java",)
         else:
-            candidates.extend(sorted(parent.iterdir()))
+            suffix_groups = None
 
-        seen = set()
-        for path in candidates:
+        # One directory listing ordered by (suffix group, name), the order the
+        # per-suffix sorted globs used to produce.
+        candidates: list[tuple[int, str, os.DirEntry[str]]] = []
+        try:
+            with os.scandir(parent) as entries:
+                for entry in entries:
+                    if suffix_groups is None:
+                        rank = 0
+                    else:
+                        rank = next(
+                            (idx for idx, suffix in enumerate(suffix_groups) if entry.name.endswith(suffix)),
+                            -1,
+                        )
+                        if rank < 0:
+                            continue
+                    candidates.append((rank, entry.name, entry))
+        except OSError:
+            candidates = []
+        candidates.sort(key=lambda candidate: candidate[:2])
+
+        for _, name, entry in candidates:
             if len(other_files) >= max_other_files:
                 break
-            if not path.is_file() or path == request.source_path:
-                continue
-            if path.name in seen:
+            if name == request.source_path.name or not entry.is_file():
                 continue
-            seen.add(path.name)
             try:
-                text = path.read_text(encoding="utf-8", errors="replace")
+                text = _read_text_prefix(Path(entry.path), max_file_chars)
             except OSError:
                 continue
             if not text.strip():
                 continue
-            other_files.append((path.name, text[:max_file_chars]))
+            other_files.append((name, text))
 
     details: Dict[str, Any] = {
         "errorLine": error_line,
@@ -321,44 +428,6 @@ def collect_gathered_context(
 
     sections: list[str] = []
 
-    def infer_token_from_error_text() -> Optional[str]:
-        # Prefer the enriched pointer summary inserted by prepare_compile_error_text().
-        text = request.error_text or ""
-        if not text:
-            return None
-        match = re.search(r"current token:\s*identifier\s+'([^']+)'", text)
-        if match:
-            candidate = match.group(1).strip()
-            if candidate and not any(ch.isspace() for ch in candidate):
-                return candidate
-        match = re.search(r"current token:\s*identifier\s+\"([^\"]+)\"", text)
-        if match:
-            candidate = match.group(1).strip()
-            if candidate and not any(ch.isspace() for ch in candidate):
-                return candidate
-        return None
-
-    # Determine token of interest (single token supported for now).
-    token: Optional[str] = None
-    for item in requests:
-        if not isinstance(item, Mapping):
-            continue
-        target = item.get("target")
-        if isinstance(target, Mapping):
-            name = target.get("name")
-            if isinstance(name, str) and name.strip():
-                token = name.strip()
-                break
-
-    if token is None:
-        token = infer_token_from_error_text()
-
-    requested_categories = {
-        item.get("category")
-        for item in requests
-        if isinstance(item, Mapping) and isinstance(item.get("category"), str)
-    }
-
     if "FILE_CONTEXT" in requested_categories:
         sections.append(
             "FILE_CONTEXT:\n" + f"file={request.source_path.name}\n" + f"lines={total_lines}\n"
@@ -375,19 +444,17 @@ def collect_gathered_context(
         )
 
     def find_usages_in_text(text: str, *, file_label: str) -> list[str]:
-        if not token:
+        # One C-level search over the whole file; most scanned files never
+        # mention the token and need no line split at all.
+        if not token or token not in text:
             return []
-        lines = text.splitlines()
+        lines = lines_of(text)
         hits: list[str] = []
         for idx, line in enumerate(lines, start=1):
             if token in line:
                 start = max(1, idx - usage_radius)
                 end = min(len(lines), idx + usage_radius)
-                excerpt = []
-                excerpt.append(f"{file_label}:{idx}:")
-                for lineno in range(start, end + 1):
-                    excerpt.append(f"{lineno:4d} | {lines[lineno - 1]}")
-                hits.append("\n".join(excerpt))
+                hits.append(f"{file_label}:{idx}:\n" + _format_numbered_lines(lines, start, end, rstrip=False))
                 if len(hits) >= max_hits:
                     break
         return hits
@@ -405,25 +472,26 @@ def collect_gathered_context(
             sections.append(f"USAGE_CONTEXT:\n(no occurrences of '{token}' found)")
 
     def find_declarations_in_text(text: str, *, file_label: str) -> list[tuple[str, int]]:
-        if not token:
+        if not token or token not in text:
             return []
-        patterns = [
-            re.compile(rf"\b(class|struct|enum|interface)\s+{re.escape(token)}\b"),
-            re.compile(rf"\bdef\s+{re.escape(token)}\b"),
-            re.compile(rf"\bfunction\s+{re.escape(token)}\b"),
-            re.compile(rf"\btypedef\b.*\b{re.escape(token)}\b"),
-            re.compile(rf"\b{re.escape(token)}\s*\("),
-        ]
-        lines = text.splitlines()
+        pattern = _declaration_pattern(token)
+        lines = lines_of(text)
         hits: list[tuple[str, int]] = []
         for idx, line in enumerate(lines, start=1):
-            if any(p.search(line) for p in patterns):
+            # Every alternative contains the token verbatim.
+            if token in line and pattern.search(line):
                 hits.append((file_label, idx))
                 if len(hits) >= max_hits:
                     break
         return hits
 
-    if token and "DECLARATION" in requested_categories:
+    declaration_hits: Optional[list[tuple[str, int, str]]] = None
+
+    def find_declaration_hits() -> list[tuple[str, int, str]]:
+        # DECLARATION and TYPE_CONTEXT share this search; run it once.
+        nonlocal declaration_hits
+        if declaration_hits is not None:
+            return declaration_hits
         hits: list[tuple[str, int, str]] = []
         for file_label, line_no in find_declarations_in_text(
             request.source_text, file_label=request.source_path.name
@@ -450,9 +518,14 @@ def collect_gathered_context(
                 )
                 if len(hits) >= max_hits:
                     break
-        if hits:
+        declaration_hits = hits
+        return hits
+
+    if token and "DECLARATION" in requested_categories:
+        declarations = find_declaration_hits()
+        if declarations:
             blocks: list[str] = []
-            for file_label, line_no, excerpt in hits:
+            for file_label, line_no, excerpt in declarations:
                 header = f"{file_label} (around line {line_no}):"
                 if excerpt.strip():
                     blocks.append(header + "\n" + excerpt)
@@ -464,35 +537,10 @@ def collect_gathered_context(
 
     if token and "TYPE_CONTEXT" in requested_categories:
         # For now, reuse declaration heuristics; refine later per-language.
-        hits: list[tuple[str, int, str]] = []
-        for file_label, line_no in find_declarations_in_text(
-            request.source_text, file_label=request.source_path.name
-        ):
-            hits.append(
-                (
-                    file_label,
-                    line_no,
-                    numbered_window_for_text(request.source_text, center_line=line_no, radius=5),
-                )
-            )
-            if len(hits) >= max_hits:
-                break
-        for name, text in other_files:
-            if len(hits) >= max_hits:
-                break
-            for file_label, line_no in find_declarations_in_text(text, file_label=name):
-                hits.append(
-                    (
-                        file_label,
-                        line_no,
-                        numbered_window_for_text(text, center_line=line_no, radius=5),
-                    )
-                )
-                if len(hits) >= max_hits:
-                    break
-        if hits:
+        declarations = find_declaration_hits()
+        if declarations:
             blocks: list[str] = []
-            for file_label, line_no, excerpt in hits:
+            for file_label, line_no, excerpt in declarations:
                 header = f"{file_label} (around line {line_no}):"
                 if excerpt.strip():
                     blocks.append(header + "\n" + excerpt)
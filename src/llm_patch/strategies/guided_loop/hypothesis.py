@@ -110,6 +110,8 @@ class HypothesisManager:
         self._rejected: Dict[str, Hypothesis] = {}
         self._archived: Dict[str, Hypothesis] = {}
         self._expired: Dict[str, Hypothesis] = {}
+        # The bucket each id currently lives in; an id is in exactly one bucket.
+        self._locations: Dict[str, Dict[str, Hypothesis]] = {}
 
     def _allocate_id(self) -> str:
         return f"H{next(self._id_counter):03d}"
@@ -143,7 +145,7 @@ class HypothesisManager:
             binding_region=binding_region,
             selection_rationale=selection_rationale,
         )
-        self._active[identifier] = hypothesis
+        self._place(hypothesis, self._active)
         return hypothesis
 
     def active(self) -> List[Hypothesis]:
@@ -153,19 +155,15 @@ class HypothesisManager:
         return len(self._active)
 
     def get(self, hypothesis_id: str) -> Optional[Hypothesis]:
-        return (
-            self._active.get(hypothesis_id)
-            or self._falsified.get(hypothesis_id)
-            or self._rejected.get(hypothesis_id)
-            or self._archived.get(hypothesis_id)
-            or self._expired.get(hypothesis_id)
-        )
+        bucket = self._locations.get(hypothesis_id)
+        if bucket is None:
+            return None
+        return bucket.get(hypothesis_id)
 
     def record(self, hypothesis: Hypothesis) -> None:
-        """Register an externally constructed hypothesis."""
+        """Register an externally constructed hypothesis, replacing any with the same id."""
 
-        bucket = self._bucket_for_status(hypothesis.status)
-        bucket[hypothesis.id] = hypothesis
+        self._place(hypothesis, self._bucket_for_status(hypothesis.status))
 
     def set_status(self, hypothesis_id: str, status: HypothesisStatus) -> Optional[Hypothesis]:
         hypothesis = self.get(hypothesis_id)
@@ -173,9 +171,8 @@ class HypothesisManager:
             return None
         if hypothesis.status == status:
             return hypothesis
-        self._remove_from_all(hypothesis_id)
         hypothesis.status = status
-        self._bucket_for_status(status)[hypothesis_id] = hypothesis
+        self._place(hypothesis, self._bucket_for_status(status))
         return hypothesis
 
     def increment_retry(self, hypothesis_id: str) -> Optional[int]:
@@ -242,15 +239,12 @@ class HypothesisManager:
             return self._expired
         return self._active
 
-    def _remove_from_all(self, hypothesis_id: str) -> None:
-        for bucket in (
-            self._active,
-            self._falsified,
-            self._rejected,
-            self._archived,
-            self._expired,
-        ):
-            bucket.pop(hypothesis_id, None)
+    def _place(self, hypothesis: Hypothesis, bucket: Dict[str, Hypothesis]) -> None:
+        previous = self._locations.get(hypothesis.id)
+        if previous is not None and previous is not bucket:
+            previous.pop(hypothesis.id, None)
+        bucket[hypothesis.id] = hypothesis
+        self._locations[hypothesis.id] = bucket
 
     @staticmethod
     def _clone_bucket(bucket: Dict[str, Hypothesis]) -> List[Hypothesis]:
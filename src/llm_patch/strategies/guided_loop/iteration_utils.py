@@ -17,6 +17,12 @@ from .phases import GuidedIterationArtifact, GuidedPhase, PhaseArtifact
 
 
 def find_phase_response(iteration: GuidedIterationArtifact, phase: GuidedPhase) -> Optional[str]:
+    first = iteration.phase_artifact(phase)
+    if first is None:
+        return None
+    if first.response:
+        return first.response
+    # Rare: an earlier artifact for this phase came back empty; keep looking.
     for artifact in iteration.phases:
         if artifact.phase == phase and artifact.response:
             return artifact.response
@@ -24,10 +30,7 @@ def find_phase_response(iteration: GuidedIterationArtifact, phase: GuidedPhase)
 
 
 def find_phase_artifact(iteration: GuidedIterationArtifact, phase: GuidedPhase) -> Optional[PhaseArtifact]:
-    for artifact in iteration.phases:
-        if artifact.phase == phase:
-            return artifact
-    return None
+    return iteration.phase_artifact(phase)
 
 
 def find_gathered_context(iteration: GuidedIterationArtifact) -> Optional[str]:
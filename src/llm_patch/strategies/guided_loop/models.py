@@ -7,12 +7,18 @@ smaller, testable modules.
 
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass, field
-from typing import Any, Mapping, Optional, Sequence, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
 
 from ..base import PatchRequest, PatchResult
 from .phases import GuidedLoopTrace
 
+# Every boundary str.splitlines() recognises, so ``line_starts`` agrees with
+# ``lines`` and ``line_range`` on text carrying \r, form feeds or U+2028.
+_LINE_BREAK_PATTERN = re.compile("\r\n|[\n\r\v\f\x1c-\x1e\x85\u2028\u2029]")
+_NON_NEWLINE_BREAK_PATTERN = re.compile("[\r\v\f\x1c-\x1e\x85\u2028\u2029]")
+
 
 @dataclass(slots=True)
 class GuidedLoopConfig:
@@ -24,9 +30,20 @@ class GuidedLoopConfig:
     interpreter_model: str = "planner"
     patch_model: str = "patcher"
     critique_model: Optional[str] = None
+    # Diagnose/Propose emit short prose and can run on a smaller model; None
+    # falls back to interpreter_model / patch_model respectively.
+    diagnose_model: Optional[str] = None
+    propose_model: Optional[str] = None
     temperature: float = 0.0
     auto_constraints: bool = True
     compile_check: bool = True
+    # Seconds before a compile/test command is abandoned; None waits indefinitely.
+    compile_timeout: Optional[float] = None
+    # Bytes of compile stdout/stderr kept per stream (from the start); None keeps all.
+    compile_output_limit: Optional[int] = None
+    # Lead prompts with the shared error/context block so backends with prefix
+    # caching can reuse it across phases (and across critique prompts).
+    prefix_first_prompts: bool = False
 
     def total_iterations(self) -> int:
         base = max(1, self.max_iterations)
@@ -35,6 +52,90 @@ class GuidedLoopConfig:
         return (base + refinements) * passes
 
 
+@dataclass(slots=True, eq=False)
+class SourceView:
+    """Source text plus the offset where each line starts.
+
+    Windows are sliced straight out of ``text`` via ``line_starts``; the full
+    per-line tuple is only materialized if a caller asks for ``lines``.
+    Identity equality keeps the view cheap to use as a cache key.
+    """
+
+    text: str
+    line_starts: Tuple[int, ...]
+    _lines: Optional[Tuple[str, ...]] = field(default=None, init=False, repr=False)
+    # Renderings derived from ``text`` (context slices, focused windows); they go
+    # away with the view, i.e. with the request that owns it.
+    _derived: Dict[Tuple[Any, ...], str] = field(default_factory=dict, init=False, repr=False)
+
+    @classmethod
+    def from_text(cls, text: str) -> "SourceView":
+        # Offsets only, no per-line strings. A break at the very end of the text
+        # does not start another line, matching len(text.splitlines()).
+        if not text:
+            return cls(text=text, line_starts=())
+        size = len(text)
+        starts = [0]
+        if _NON_NEWLINE_BREAK_PATTERN.search(text) is None:
+            find = text.find
+            pos = find("\n")
+            while pos != -1 and pos + 1 < size:
+                starts.append(pos + 1)
+                pos = find("\n", pos + 1)
+        else:
+            starts.extend(
+                end for end in (m.end() for m in _LINE_BREAK_PATTERN.finditer(text)) if end < size
+            )
+        return cls(text=text, line_starts=tuple(starts))
+
+    @property
+    def line_count(self) -> int:
+        return len(self.line_starts)
+
+    @property
+    def lines(self) -> Tuple[str, ...]:
+        if self._lines is None:
+            self._lines = tuple(self.text.splitlines())
+        return self._lines
+
+    def derived(self, key: Tuple[Any, ...], build: Callable[[], str]) -> str:
+        """Return ``build()``, computed once per ``key`` for this view."""
+
+        cached = self._derived.get(key)
+        if cached is None:
+            cached = self._derived[key] = build()
+        return cached
+
+    def line_range(self, start: int, end: int) -> List[str]:
+        """Return lines ``start``..``end`` (1-based, inclusive) without splitting the whole text."""
+
+        count = len(self.line_starts)
+        start = max(1, start)
+        end = min(count, end)
+        if start > end:
+            return []
+        begin = self.line_starts[start - 1]
+        stop = self.line_starts[end] if end < count else len(self.text)
+        return self.text[begin:stop].splitlines()
+
+
+@dataclass(slots=True)
+class ReplacementBlock:
+    """One ORIGINAL/CHANGED pair of a replacement-block diff, already normalised.
+
+    A plain record: the line lists are shared with the parser output, not copied.
+    It still unpacks as the ``(original, updated)`` pair parse_replacement_blocks
+    used to return.
+    """
+
+    original: List[str]
+    updated: List[str]
+
+    def __iter__(self) -> Iterator[List[str]]:
+        yield self.original
+        yield self.updated
+
+
 @dataclass(slots=True)
 class GuidedLoopInputs(PatchRequest):
     """Adds guided-loop specific context to the base patch request."""
@@ -44,11 +145,39 @@ class GuidedLoopInputs(PatchRequest):
     history_seed: Sequence[str] = field(default_factory=tuple)
     initial_outcome: Optional[Mapping[str, Any]] = None
     raw_error_text: Optional[str] = None
+    _source_view: Optional[SourceView] = field(default=None, init=False, repr=False, compare=False)
+    _error_line_cache: Dict[Tuple[str, str], Optional[int]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
 
     def __post_init__(self) -> None:  # pragma: no cover - trivial wiring
         if self.raw_error_text is None:
             self.raw_error_text = self.error_text
 
+    def source_view(self) -> SourceView:
+        """Return the split view of ``source_text``, rebuilding it if the text changed."""
+
+        text = self.source_text or ""
+        view = self._source_view
+        if view is None or view.text is not text:
+            view = SourceView.from_text(text)
+            self._source_view = view
+        return view
+
+    def error_line(
+        self, detect_error_line: Callable[[str, str], Optional[int]], filename: str
+    ) -> Optional[int]:
+        """Return ``detect_error_line(error_text, filename)``, scanned once per request.
+
+        Keyed by the current ``error_text``, so replacing it is a fresh lookup.
+        """
+
+        key = (self.error_text or "", filename)
+        cache = self._error_line_cache
+        if key not in cache:
+            cache[key] = detect_error_line(*key)
+        return cache[key]
+
 
 @dataclass(slots=True)
 class GuidedLoopResult(PatchResult):
@@ -79,6 +208,10 @@ class IterationOutcome:
     diff_span: Optional[Tuple[int, int]] = None
     error_message: Optional[str] = None
     error_location: Optional[int] = None
+    # Memoized by evaluation.stall_signature once the outcome is final.
+    stall_signature: Optional[Tuple[str, Optional[int], Tuple[int, int]]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     @property
     def compile_success(self) -> bool:
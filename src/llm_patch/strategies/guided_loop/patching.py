@@ -18,20 +18,28 @@ import shutil
 import subprocess
 import tempfile
 from pathlib import Path
-from typing import Callable, List, Optional, Sequence, Tuple
+from typing import Callable, Iterable, List, Match, Optional, Sequence, Tuple
 
 from diff_match_patch import diff_match_patch
 
-from llm_patch.patch_applier import PatchApplier, normalize_replacement_block
+from llm_patch.patch_applier import PatchApplier, normalize_replacement_block, scan_replacement_blocks
 from llm_patch.markdown import strip_fence_lines
 
-from .models import GuidedLoopInputs
+from .models import GuidedLoopInputs, ReplacementBlock, SourceView
 
 
 REPLACEMENT_BLOCK_PATTERN = re.compile(
     r"ORIGINAL LINES:\s*\n(?P<original>.*?)\n(?:CHANGED|NEW) LINES:\s*\n(?P<updated>.*?)(?=(?:\nORIGINAL LINES:|\Z))",
     re.DOTALL,
 )
+HUNK_HEADER_RE = re.compile(
+    r"^@@ -(?P<start_a>\d+)(?:,(?P<len_a>\d+))? \+(?P<start_b>\d+)(?:,(?P<len_b>\d+))? @@",
+    re.MULTILINE,
+)
+# A whole Markdown fence line (see llm_patch.markdown.is_fence_line) and its "\n".
+FENCE_LINE_RE = re.compile(r"^[^\S\n]*(?:```|~~~)[^\n]*(?:\n|\Z)", re.MULTILINE)
+# Line boundaries str.splitlines() honours besides "\n" / "\r\n".
+UNUSUAL_LINE_BREAK_PATTERN = re.compile("\r(?!\n)|[\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
 
 
 def strip_code_fences(text: str) -> str:
@@ -44,16 +52,58 @@ def strip_code_fences(text: str) -> str:
 
     if not text:
         return text
-    return strip_fence_lines(text).strip()
+    if "\r" in text or UNUSUAL_LINE_BREAK_PATTERN.search(text):
+        # strip_fence_lines() rejoins splitlines() output with "\n"; keep it for
+        # the line breaks a "\n"-anchored pattern would not see.
+        return strip_fence_lines(text).strip()
+    if "```" not in text and "~~~" not in text:
+        return text.strip()
+    return FENCE_LINE_RE.sub("", text).strip()
+
+
+_BLOCK_HEADERS = ("ORIGINAL LINES:", "CHANGED LINES:", "NEW LINES:")
 
 
-def parse_replacement_blocks(diff_text: str) -> List[tuple[List[str], List[str]]]:
-    blocks: List[tuple[List[str], List[str]]] = []
-    text = diff_text.strip()
-    for match in REPLACEMENT_BLOCK_PATTERN.finditer(text):
-        original_lines = split_block_lines(match.group("original"))
-        updated_lines = split_block_lines(match.group("updated"))
-        blocks.append((original_lines, updated_lines))
+def drop_prose_after_fenced_bodies(text: str) -> str:
+    """Drop commentary the model wrote after a fenced block body.
+
+    Once a body that opened with a fence has closed, non-fence lines up to the
+    next block header are prose ("Next, fix the loop:", "### Block 2"), not
+    code. Unfenced bodies are left alone: their end cannot be told apart from
+    more code. Runs on the complete response, so later blocks are never lost.
+    """
+
+    if "```" not in text and "~~~" not in text:
+        return text
+    kept: List[str] = []
+    in_body = fenced = fence_open = False
+    for line in text.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped.startswith(_BLOCK_HEADERS):
+            in_body, fenced, fence_open = True, False, False
+        elif stripped.startswith(("```", "~~~")):
+            if in_body and not fenced:
+                fenced = fence_open = True
+            elif fenced:
+                fence_open = not fence_open
+        elif stripped:
+            if fenced and not fence_open:
+                continue
+            # The first code line of an unfenced body: nothing here is dropped.
+            in_body = False
+        kept.append(line)
+    return "".join(kept)
+
+
+def parse_replacement_blocks(diff_text: str) -> List[ReplacementBlock]:
+    blocks: List[ReplacementBlock] = []
+    # Same blocks as scanning diff_text.strip(): leading whitespace never holds a
+    # header, and trailing whitespace is excluded by bounding the scan instead.
+    end = len(diff_text)
+    while end and diff_text[end - 1].isspace():
+        end -= 1
+    for original, updated in scan_replacement_blocks(diff_text, end):
+        blocks.append(ReplacementBlock(split_block_lines(original), split_block_lines(updated)))
     return blocks
 
 
@@ -74,23 +124,33 @@ def replacement_diff_spans(
     source_text: str,
     *,
     patch_applier: PatchApplier,
+    blocks: Optional[Sequence[ReplacementBlock]] = None,
+    view: Optional[SourceView] = None,
 ) -> tuple[tuple[int, int] | None, tuple[int, int] | None]:
-    before_spans: List[tuple[int, int]] = []
-    after_spans: List[tuple[int, int]] = []
-    source_lines = source_text.splitlines()
-    blocks = parse_replacement_blocks(diff_text)
-    for original_lines, updated_lines in blocks:
-        if not original_lines:
+    # Both spans of a block start on the same line, so one running minimum serves
+    # before and after; the ends are tracked separately.
+    first_line: Optional[int] = None
+    before_end = after_end = 0
+    if view is not None and view.text is source_text:
+        source_lines: Sequence[str] = view.lines
+    else:
+        source_lines = source_text.splitlines()
+    if blocks is None:
+        blocks = parse_replacement_blocks(diff_text)
+    for block in blocks:
+        if not block.original:
             continue
-        index = patch_applier.find_context(source_lines, original_lines)
+        index = patch_applier.find_context(source_lines, block.original)
         if index is None:
             continue
         start_line = index + 1
-        before_span = (start_line, start_line + max(len(original_lines), 1) - 1)
-        after_span = (start_line, start_line + max(len(updated_lines), 1) - 1)
-        before_spans.append(before_span)
-        after_spans.append(after_span)
-    return aggregate_spans(before_spans), aggregate_spans(after_spans)
+        if first_line is None or start_line < first_line:
+            first_line = start_line
+        before_end = max(before_end, start_line + len(block.original) - 1)
+        after_end = max(after_end, start_line + max(len(block.updated), 1) - 1)
+    if first_line is None:
+        return None, None
+    return (first_line, before_end), (first_line, after_end)
 
 
 def diff_spans(
@@ -98,12 +158,26 @@ def diff_spans(
     *,
     source_text: str | None = None,
     patch_applier: PatchApplier | None = None,
+    blocks: Optional[Sequence[ReplacementBlock]] = None,
+    view: Optional[SourceView] = None,
 ) -> tuple[tuple[int, int] | None, tuple[int, int] | None]:
-    pattern = re.compile(r"@@ -(?P<start_a>\d+)(?:,(?P<len_a>\d+))? \+(?P<start_b>\d+)(?:,(?P<len_b>\d+))? @@")
+    """Approximate (before, after) line spans touched by a diff.
+
+    ``blocks`` may carry an already-parsed ``parse_replacement_blocks(diff_text)``
+    result so the replacement-block branch does not parse the diff again. When
+    ``view`` is the SourceView of ``source_text``, its cached lines are reused.
+    """
+
     spans_a: List[tuple[int, int]] = []
     spans_b: List[tuple[int, int]] = []
-    for line in diff_text.splitlines():
-        match = pattern.match(line)
+    matches: Iterable[Optional[Match[str]]]
+    if UNUSUAL_LINE_BREAK_PATTERN.search(diff_text):
+        # "^" only follows "\n"; walk splitlines() so every line break counts.
+        matches = (HUNK_HEADER_RE.match(line) for line in diff_text.splitlines() if line.startswith("@@ "))
+    else:
+        # One pass of the regex engine over the buffer, yielding only hunk headers.
+        matches = HUNK_HEADER_RE.finditer(diff_text)
+    for match in matches:
         if not match:
             continue
         start_a = int(match.group("start_a"))
@@ -119,7 +193,9 @@ def diff_spans(
     if source_text and "ORIGINAL LINES:" in diff_text and "NEW LINES:" in diff_text:
         if patch_applier is None:
             raise RuntimeError("patch_applier is required to compute replacement diff spans")
-        return replacement_diff_spans(diff_text, source_text, patch_applier=patch_applier)
+        return replacement_diff_spans(
+            diff_text, source_text, patch_applier=patch_applier, blocks=blocks, view=view
+        )
 
     return None, None
 
@@ -127,7 +203,7 @@ def diff_spans(
 def apply_diff_text(
     request: GuidedLoopInputs,
     diff_text: str,
-    replacement_blocks: List[tuple[List[str], List[str]]],
+    replacement_blocks: Sequence[ReplacementBlock],
     *,
     patch_applier: PatchApplier,
     dmp: diff_match_patch,
@@ -136,7 +212,7 @@ def apply_diff_text(
     suffix_collapse_max_lines: int,
     suffix_collapse_similarity: float,
 ) -> tuple[Optional[str], bool, str, tuple[tuple[int, int] | None, tuple[int, int] | None] | None]:
-    if replacement_blocks and all(original for original, _ in replacement_blocks):
+    if replacement_blocks and all(block.original for block in replacement_blocks):
         patched_text, applied, message, spans = apply_three_way_blocks(
             request,
             replacement_blocks,
@@ -156,7 +232,13 @@ def apply_diff_text(
         patched_text, applied = patch_applier.apply(request.source_text, diff_text)
         if not applied:
             return None, False, message, None
-        spans = diff_spans(diff_text, source_text=request.source_text, patch_applier=patch_applier)
+        spans = diff_spans(
+            diff_text,
+            source_text=request.source_text,
+            patch_applier=patch_applier,
+            blocks=replacement_blocks,
+            view=request.source_view(),
+        )
         return (
             patched_text,
             True,
@@ -167,13 +249,19 @@ def apply_diff_text(
     patched_text, applied = patch_applier.apply(request.source_text, diff_text)
     if not applied:
         return None, False, "Patch applier could not locate context", None
-    spans = diff_spans(diff_text, source_text=request.source_text, patch_applier=patch_applier)
+    spans = diff_spans(
+        diff_text,
+        source_text=request.source_text,
+        patch_applier=patch_applier,
+        blocks=replacement_blocks,
+        view=request.source_view(),
+    )
     return patched_text, True, "Patch applied successfully", spans
 
 
 def apply_three_way_blocks(
     request: GuidedLoopInputs,
-    replacement_blocks: List[tuple[List[str], List[str]]],
+    replacement_blocks: Sequence[ReplacementBlock],
     *,
     patch_applier: PatchApplier,
     dmp: diff_match_patch,
@@ -213,10 +301,10 @@ def apply_three_way_blocks(
         message = merge_diag or "Three-way merge failed while applying patch."
         return None, False, message, None
 
-    source_lines = request.source_text.splitlines()
+    source_lines = request.source_view().lines
     start_idx = max(0, start_line - 1)
     end_idx = start_idx + original_length
-    trailing_lines = source_lines[end_idx:]
+    trailing_lines: Sequence[str] = source_lines[end_idx:]
     trailing_lines = collapse_suffix_overlap(
         merged_fragment,
         trailing_lines,
@@ -225,7 +313,7 @@ def apply_three_way_blocks(
         suffix_collapse_similarity=suffix_collapse_similarity,
     )
 
-    updated_source = source_lines[:start_idx] + merged_fragment + trailing_lines
+    updated_source = [*source_lines[:start_idx], *merged_fragment, *trailing_lines]
     trailing_newline = request.source_text.endswith("\n")
     patched_text = "\n".join(updated_source)
     if trailing_newline and not patched_text.endswith("\n"):
@@ -239,20 +327,18 @@ def apply_three_way_blocks(
 
 def build_target_fragment(
     base_fragment: List[str],
-    replacement_blocks: List[tuple[List[str], List[str]]],
+    replacement_blocks: Sequence[ReplacementBlock],
     *,
     patch_applier: PatchApplier,
 ) -> tuple[bool, Optional[List[str]], Optional[str]]:
     working = list(base_fragment)
-    for index, (original_lines, updated_lines) in enumerate(replacement_blocks, start=1):
-        if not original_lines:
+    for index, block in enumerate(replacement_blocks, start=1):
+        if not block.original:
             return False, None, "Replacement block missing ORIGINAL LINES; cannot merge."
-        position = patch_applier.find_context(working, list(original_lines))
+        position = patch_applier.find_context(working, block.original)
         if position is None:
             return False, None, f"Could not locate ORIGINAL block {index} within context fragment."
-        before = working[:position]
-        after = working[position + len(original_lines) :]
-        working = before + list(updated_lines) + after
+        working[position : position + len(block.original)] = block.updated
     return True, working, None
 
 
@@ -261,6 +347,17 @@ def merge_fragment_versions(
     local_fragment: Sequence[str],
     target_fragment: Sequence[str],
 ) -> tuple[bool, Optional[List[str]], Optional[str]]:
+    """Three-way merge ``local`` and ``target`` against ``base`` with ``git merge-file``.
+
+    When one side is unchanged the merge is just the other side, so no
+    subprocess is spawned; the result still goes through the same text
+    round-trip the git output would.
+    """
+
+    if list(local_fragment) == list(base_fragment):
+        return True, lines_to_text(target_fragment).splitlines(), None
+    if list(target_fragment) == list(base_fragment):
+        return True, lines_to_text(local_fragment).splitlines(), None
     git_executable = shutil.which("git")
     if not git_executable:
         return False, None, "Git executable not found; cannot perform three-way merge."
@@ -309,12 +406,17 @@ def collapse_suffix_overlap(
         len(target_fragment),
         len(trailing_lines),
     )
+    if max_overlap <= 0:
+        return list(trailing_lines)
+    # Normalise each candidate line once; every overlap length reuses the same
+    # lists, and only non-identical windows pay for a diff.
+    suffix_lines = target_fragment[-max_overlap:]
+    normalized_suffix = [normalize_line(line) for line in suffix_lines]
+    normalized_prefix = [normalize_line(line) for line in trailing_lines[:max_overlap]]
     for overlap in range(max_overlap, 0, -1):
-        suffix = target_fragment[-overlap:]
-        prefix = trailing_lines[:overlap]
-        if blocks_match(
-            suffix,
-            prefix,
+        if normalized_suffix[-overlap:] == normalized_prefix[:overlap] or blocks_similar(
+            suffix_lines[-overlap:],
+            trailing_lines[:overlap],
             dmp=dmp,
             suffix_collapse_similarity=suffix_collapse_similarity,
         ):
@@ -335,22 +437,38 @@ def blocks_match(
         return False
     if all(normalize_line(a) == normalize_line(b) for a, b in zip(suffix, prefix)):
         return True
+    return blocks_similar(suffix, prefix, dmp=dmp, suffix_collapse_similarity=suffix_collapse_similarity)
+
+
+def blocks_similar(
+    suffix: Sequence[str],
+    prefix: Sequence[str],
+    *,
+    dmp: diff_match_patch,
+    suffix_collapse_similarity: float,
+) -> bool:
+    """Character-level similarity test behind ``blocks_match``."""
 
     text_a = "\n".join(suffix)
     text_b = "\n".join(prefix)
     if not text_a and not text_b:
         return True
+    denominator = max(len(text_a), len(text_b), 1)
+    # Equal characters can never exceed the shorter text, so the length ratio
+    # bounds the similarity; reject without diffing when it already falls short.
+    if min(len(text_a), len(text_b)) / denominator < suffix_collapse_similarity:
+        return False
 
     diffs = dmp.diff_main(text_a, text_b)
     dmp.diff_cleanupSemantic(diffs)
     equal_chars = sum(len(chunk) for op, chunk in diffs if op == 0)
-    denominator = max(len(text_a), len(text_b), 1)
     similarity = equal_chars / denominator
     return similarity >= suffix_collapse_similarity
 
 
 def normalize_line(line: str) -> str:
-    return " ".join(line.strip().split())
+    # split() with no separator already drops leading and trailing whitespace.
+    return " ".join(line.split())
 
 
 def context_fragment_lines(
@@ -359,22 +477,22 @@ def context_fragment_lines(
     detect_error_line: Callable[[str, str], Optional[int]],
     radius: int,
 ) -> Optional[tuple[int, List[str]]]:
-    source = request.source_text or ""
-    if not source:
+    if not request.source_text:
         return None
-    lines = source.splitlines()
-    if not lines:
+    view = request.source_view()
+    line_count = view.line_count
+    if not line_count:
         return None
     filename = request.source_path.name if request.source_path else ""
-    error_line = detect_error_line(request.error_text or "", filename)
+    error_line = request.error_line(detect_error_line, filename)
     if error_line is None:
         start = 1
-        end = min(len(lines), start + (radius * 2))
+        end = min(line_count, start + (radius * 2))
     else:
-        center = max(1, min(error_line, len(lines)))
+        center = max(1, min(error_line, line_count))
         start = max(1, center - radius)
-        end = min(len(lines), center + radius)
-    fragment = lines[start - 1 : end]
+        end = min(line_count, center + radius)
+    fragment = view.line_range(start, end)
     return start, fragment
 
 
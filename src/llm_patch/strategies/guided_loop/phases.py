@@ -86,6 +86,25 @@ class GuidedIterationArtifact:
     compile_stdout: Optional[str] = None
     compile_stderr: Optional[str] = None
 
+    # First artifact per phase. ``phases`` only ever grows through
+    # ``append_phase``, which keeps this index in step with it.
+    _phase_index: Dict[GuidedPhase, PhaseArtifact] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        for artifact in self.phases:
+            self._phase_index.setdefault(artifact.phase, artifact)
+
+    def append_phase(self, artifact: PhaseArtifact) -> None:
+        """Append ``artifact`` to ``phases`` and index it by phase."""
+
+        self._phase_index.setdefault(artifact.phase, artifact)
+        self.phases.append(artifact)
+
+    def phase_artifact(self, phase: GuidedPhase) -> Optional[PhaseArtifact]:
+        return self._phase_index.get(phase)
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "index": self.index,
@@ -125,7 +144,7 @@ class GuidedLoopTrace:
     notes: Optional[str] = None
 
     def add_phase(self, iteration: GuidedIterationArtifact, artifact: PhaseArtifact) -> None:
-        iteration.phases.append(artifact)
+        iteration.append_phase(artifact)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -12,12 +12,17 @@ It centralizes:
 
 from __future__ import annotations
 
-from typing import Any, Dict, List, Mapping, Optional, Sequence
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
 
-from .models import GuidedLoopInputs, IterationOutcome
+from .models import GuidedLoopInputs, IterationOutcome, SourceView
 from .phases import GuidedPhase
 
 
+# Upper bound on critique excerpts; a large span would otherwise paste most of
+# the file into every critique prompt.
+MAX_SNIPPET_LINES = 200
+
+
 def diagnosis_placeholder() -> str:
     return "Diagnosis not available yet; run the Diagnose phase first."
 
@@ -131,7 +136,12 @@ def context_for_phase(
 
 
 def default_context_slice(request: GuidedLoopInputs, limit: int = 2000) -> str:
-    source = (request.source_text or "").strip()
+    view = request.source_view()
+    return view.derived(("context_slice", limit), lambda: _context_slice(view.text, limit))
+
+
+def _context_slice(source_text: str, limit: int) -> str:
+    source = source_text.strip()
     if not source:
         return "Source unavailable."
     if len(source) <= limit:
@@ -145,32 +155,38 @@ def focused_context_window(
     detect_error_line,
     radius: int = 5,
 ) -> str:
-    source = request.source_text
-    if not source:
-        return "Source unavailable."
-    lines = source.splitlines()
-    if not lines:
+    if not request.source_text:
         return "Source unavailable."
     filename = request.source_path.name if request.source_path else ""
-    error_line = detect_error_line(request.error_text or "", filename)
+    error_text = request.error_text or ""
+    view = request.source_view()
+    # Memoised on the request's view, so it is released with the request.
+    return view.derived(
+        ("focused_window", error_text, filename, radius, detect_error_line),
+        lambda: _focused_window(view, request.error_line(detect_error_line, filename), radius),
+    )
+
+
+def _focused_window(view: SourceView, error_line: Optional[int], radius: int) -> str:
+    line_count = view.line_count
+    if not line_count:
+        return "Source unavailable."
     if error_line is None:
         start = 1
-        end = min(len(lines), start + (radius * 2))
+        end = min(line_count, start + (radius * 2))
     else:
-        center = max(1, min(error_line, len(lines)))
+        center = max(1, min(error_line, line_count))
         start = max(1, center - radius)
-        end = min(len(lines), center + radius)
-    snippet = lines[start - 1 : end]
+        end = min(line_count, center + radius)
+    snippet = view.line_range(start, end)
     return format_numbered_block(snippet, start)
 
 
 def format_numbered_block(lines: Sequence[str], starting_line: int) -> str:
-    formatted: List[str] = []
-    line_no = starting_line
-    for line in lines:
-        formatted.append(f"{line_no:>4} | {line}")
-        line_no += 1
-    return "\n".join(formatted) if formatted else "Source unavailable."
+    if not lines:
+        return "Source unavailable."
+    # A list comprehension, not a generator: str.join materialises its input anyway.
+    return "\n".join([f"{line_no:>4} | {line}" for line_no, line in enumerate(lines, starting_line)])
 
 
 def critique_snippet(
@@ -179,16 +195,27 @@ def critique_snippet(
     *,
     radius: int = 5,
     fallback: str,
+    view: Optional[SourceView] = None,
 ) -> str:
-    if not text:
+    """Render the numbered excerpt around ``span``.
+
+    When ``view`` is the request's SourceView for this same text, the excerpt is
+    sliced from its line offsets instead of splitting the full text.
+    """
+
+    if not text or not span:
         return fallback
+    start = max(1, span[0] - radius)
+    if view is not None and view.text is text:
+        line_count = view.line_count
+        if not line_count:
+            return fallback
+        end = min(line_count, span[1] + radius, start + MAX_SNIPPET_LINES - 1)
+        return format_numbered_block(view.line_range(start, end), start)
     lines = text.splitlines()
     if not lines:
         return fallback
-    if not span:
-        return fallback
-    start = max(1, span[0] - radius)
-    end = min(len(lines), span[1] + radius)
+    end = min(len(lines), span[1] + radius, start + MAX_SNIPPET_LINES - 1)
     excerpt = lines[start - 1 : end]
     return format_numbered_block(excerpt, start)
 
@@ -203,7 +230,15 @@ def build_critique_prompt(
     after_snippet: str,
     diff_text: str,
     validation_summary: str,
+    stable_first: bool = False,
 ) -> str:
+    """Assemble the critique prompt.
+
+    With ``stable_first`` the original error moves up next to the header and
+    checklist, so consecutive critique prompts in a run share a longer leading
+    prefix that the backend can reuse.
+    """
+
     header = (
         "Summarize the critique of the applied patch in three focused sections."
         if applied
@@ -216,18 +251,25 @@ def build_critique_prompt(
         "2) Could the patch be applied? — If not, explain why.\n"
         "3) In one word was the outcome successful? If not, declare the hypothesis to be 'REJECTED' ."
     )
-    sections = [
-        header,
-        checklist,
-        f"Validation summary:\n{validation_summary}",
-        f"Recent iteration history:\n{history_context}",
-        f"Original error:\n{error_text}",
-        f"Active hypothesis summary:\n{active_hypothesis_text}",
-        "Original Code before suggested replacement was applied:\n" + (before_snippet or "Source unavailable."),
-        "Replacement block(s) that were applied:\n" + diff_text.strip(),
-        "Updated Code after suggested replacement was applied:\n" + (after_snippet or "Source unavailable."),
+    # (label, body) pairs joined in one pass: formatting each section first would
+    # copy every large body (history, snippets, diff) once more before the join.
+    error_section = ("Original error:\n", error_text)
+    sections: List[Tuple[str, str]] = [
+        ("", header),
+        ("", checklist),
+        *([error_section] if stable_first else []),
+        ("Validation summary:\n", validation_summary),
+        ("Recent iteration history:\n", history_context),
+        *([] if stable_first else [error_section]),
+        ("Active hypothesis summary:\n", active_hypothesis_text),
+        ("Original Code before suggested replacement was applied:\n", before_snippet or "Source unavailable."),
+        ("Replacement block(s) that were applied:\n", diff_text.strip()),
+        ("Updated Code after suggested replacement was applied:\n", after_snippet or "Source unavailable."),
     ]
-    return "\n\n".join(sections).strip()
+    pieces: List[str] = []
+    for label, body in sections:
+        pieces += ("\n\n", label, body)
+    return "".join(pieces[1:]).strip()
 
 
 def format_prior_patch_summary(
@@ -376,6 +376,45 @@ def test_guided_loop_applies_and_compiles(sample_before_file: Path) -> None:
     assert isinstance(first_iteration.telemetry, dict)
 
 
+def test_prefix_first_prompts_share_leading_error_and_context(sample_before_file: Path) -> None:
+    diff = replacement_block("print('hello')", "print('patched')")
+    client = StubLLMClient([
+        diagnosis_payload("pass-1"),
+        planning_payload("pass-1-H1"),
+        gather_payload(),
+        proposal_payload("pass-1"),
+        diff,
+        "Critique looks good overall.",
+    ])
+    compile_command = [sys.executable, "-c", "import sys; sys.exit(0)"]
+    request = build_request(sample_before_file, compile_command)
+    strategy = GuidedConvergenceStrategy(
+        client=client,
+        config=GuidedLoopConfig(
+            interpreter_model="test",
+            patch_model="test",
+            max_iterations=1,
+            refine_sub_iterations=0,
+            main_loop_passes=1,
+            prefix_first_prompts=True,
+        ),
+    )
+
+    result = strategy.run(request)
+
+    prompts = {phase.phase: phase.prompt for phase in result.trace.iterations[0].phases}
+    shared = [
+        prompts[GuidedPhase.DIAGNOSE],
+        prompts[GuidedPhase.GATHER],
+        prompts[GuidedPhase.PROPOSE],
+        prompts[GuidedPhase.GENERATE_PATCH],
+    ]
+    assert all(prompt.startswith("Compiler error:") for prompt in shared)
+    prefix = shared[0].split("\n\n", 2)[:2]
+    assert all(prompt.split("\n\n", 2)[:2] == prefix for prompt in shared)
+    assert prompts[GuidedPhase.PLANNING].startswith("You are at the experiment-planning stage.")
+
+
 def test_generate_patch_strips_code_fences(sample_before_file: Path) -> None:
     diff = replacement_block("print('hello')", "print('patched')")
     fenced_diff = "```python\n" + diff + "```\n"
@@ -855,6 +894,10 @@ def test_three_way_merge_collapses_suffix_duplicates(tmp_path: Path) -> None:
     )
     strategy = GuidedConvergenceStrategy(client=None, config=GuidedLoopConfig())
     replacement_blocks = strategy._parse_replacement_blocks(diff)
+    # Blocks still unpack as the (original, updated) pairs older callers expect.
+    [(block_original, block_updated)] = replacement_blocks
+    assert block_original == original_block.splitlines()
+    assert block_updated == new_block.splitlines()
 
     patched_text, applied, _, _ = strategy._apply_three_way_blocks(request, replacement_blocks)
 
@@ -879,6 +922,147 @@ def test_changed_lines_replacement_blocks_are_summarized() -> None:
     assert stats["delete_only"] is False
 
 
+@pytest.mark.parametrize(
+    "text",
+    [
+        "ORIGINAL LINES:\na\nCHANGED LINES:\nb\nORIGINAL LINES:\nc\nNEW LINES:\nd",
+        "ORIGINAL LINES:\n\nNEW LINES:\nx",
+        "ORIGINAL LINES:\n  \n\tindented\nCHANGED LINES: trailing\nCHANGED LINES:\n\nz\n",
+        "prose ORIGINAL LINES: a\nORIGINAL LINES:\nb\nNEW LINES:\nc",
+        "ORIGINAL LINES:\nno updated header here",
+    ],
+)
+def test_replacement_block_scanner_matches_regex(text: str) -> None:
+    from llm_patch.strategies.guided_loop import patching
+
+    expected = [
+        (match.group("original"), match.group("updated"))
+        for match in patching.REPLACEMENT_BLOCK_PATTERN.finditer(text)
+    ]
+    assert list(patching.scan_replacement_blocks(text)) == expected
+
+
+FENCE = "```"
+
+
+def fenced_block(original: str, updated: str) -> str:
+    return f"ORIGINAL LINES:\n{FENCE}\n{original}\n{FENCE}\nCHANGED LINES:\n{FENCE}\n{updated}\n{FENCE}\n"
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        # Fenced multi-line bodies are kept whole.
+        (fenced_block("int a;", "int b;\nint c;"), fenced_block("int a;", "int b;\nint c;")),
+        # Unfenced bodies are never trimmed.
+        (
+            "ORIGINAL LINES:\nint a;\nCHANGED LINES:\nint b;\nThat fixes it.\n",
+            "ORIGINAL LINES:\nint a;\nCHANGED LINES:\nint b;\nThat fixes it.\n",
+        ),
+        # Trailing prose after a closed fence is dropped.
+        (fenced_block("int a;", "int b;") + "That fixes it.\n", fenced_block("int a;", "int b;")),
+        # Prose between blocks is dropped and the later block survives.
+        (
+            fenced_block("int a;", "int b;") + "\n### Block 2\nNext, fix the loop:\n\n" + fenced_block("x;", "y;"),
+            fenced_block("int a;", "int b;") + "\n\n" + fenced_block("x;", "y;"),
+        ),
+    ],
+)
+def test_drop_prose_after_fenced_bodies(text: str, expected: str) -> None:
+    from llm_patch.strategies.guided_loop import patching
+
+    assert patching.drop_prose_after_fenced_bodies(text) == expected
+
+
+def test_prose_between_fenced_blocks_keeps_every_block() -> None:
+    from llm_patch.strategies.guided_loop import patching
+
+    response = (
+        fenced_block("int a;", "int b;")
+        + "Next, fix the loop:\n"
+        + fenced_block("for (;;) {}", "while (true) {}")
+        + "Done.\n"
+    )
+    diff_text = patching.strip_code_fences(patching.drop_prose_after_fenced_bodies(response))
+
+    assert [tuple(block) for block in patching.parse_replacement_blocks(diff_text)] == [
+        (["int a;"], ["int b;"]),
+        (["for (;;) {}"], ["while (true) {}"]),
+    ]
+
+
+def test_unwrap_fenced_block_honours_fence_markers() -> None:
+    from llm_patch.markdown import unwrap_fenced_block
+
+    tilde_only = ("~~~",)
+    backtick_text = f"{FENCE}java\nint a;\n{FENCE}"
+
+    assert unwrap_fenced_block(backtick_text, fence_markers=tilde_only).content == backtick_text
+    unwrapped = unwrap_fenced_block("~~~java\nint a;\n~~~", fence_markers=tilde_only)
+    assert (unwrapped.content, unwrapped.fence, unwrapped.info) == ("int a;", "~~~", "java")
+    assert unwrap_fenced_block(backtick_text, fence_markers=()).content == backtick_text
+
+
+def test_ollama_stop_when_keeps_streamed_usage(monkeypatch: pytest.MonkeyPatch) -> None:
+    from llm_patch.clients import ollama
+
+    class FakeResponse:
+        def __enter__(self):
+            tokens = ["CHANGED LINES:\n", "int b;\n", "Done.\n", "never read"]
+            return iter(json.dumps({"response": token, "done": False}).encode() + b"\n" for token in tokens)
+
+        def __exit__(self, *exc_info):
+            return False
+
+    monkeypatch.setattr(ollama, "urlopen", lambda request: FakeResponse())
+    client = ollama.OllamaLLMClient(model="test")
+
+    text = client.complete(prompt="p", stop_when=lambda streamed: streamed.endswith("Done.\n"))
+
+    assert text == "CHANGED LINES:\nint b;\nDone."
+    assert client.usage.requests == 1
+    assert client.usage.completion_tokens == 3
+
+
+def test_optional_complete_kwargs_follow_client_signature() -> None:
+    class StreamingClient:
+        def __init__(self) -> None:
+            self.calls: list[dict] = []
+
+        def complete(self, *, prompt: str, temperature: float, model: str | None = None, stop_when=None) -> str:
+            self.calls.append({"prompt": prompt, "stop_when": stop_when})
+            raise TypeError("bug inside the client")
+
+    client = StreamingClient()
+    strategy = GuidedConvergenceStrategy(client=client, config=GuidedLoopConfig())
+
+    with pytest.raises(TypeError, match="bug inside the client"):
+        strategy._complete_with_optional_kwargs(
+            prompt="p", temperature=0.0, response_format="json", stop_when=bool
+        )
+    assert client.calls == [{"prompt": "p", "stop_when": bool}]
+
+    plain = GuidedConvergenceStrategy(client=StubLLMClient(["ok"]), config=GuidedLoopConfig())
+    assert plain._complete_with_optional_kwargs(prompt="p", temperature=0.0, stop_when=bool) == "ok"
+
+
+def test_phase_index_keeps_first_artifact_per_phase() -> None:
+    from llm_patch.strategies.guided_loop import GuidedIterationArtifact, PhaseArtifact, PhaseStatus
+
+    diagnose = PhaseArtifact(phase=GuidedPhase.DIAGNOSE, status=PhaseStatus.PLANNED, prompt="d")
+    planning = PhaseArtifact(phase=GuidedPhase.PLANNING, status=PhaseStatus.PLANNED, prompt="p")
+    iteration = GuidedIterationArtifact(index=1)
+    iteration.append_phase(diagnose)
+    iteration.append_phase(planning)
+    iteration.append_phase(PhaseArtifact(phase=GuidedPhase.DIAGNOSE, status=PhaseStatus.PLANNED, prompt="d2"))
+    assert iteration.phase_artifact(GuidedPhase.DIAGNOSE) is diagnose
+    assert iteration.phase_artifact(GuidedPhase.PLANNING) is planning
+    assert iteration.phase_artifact(GuidedPhase.GATHER) is None
+
+    seeded = GuidedIterationArtifact(index=2, phases=[planning])
+    assert seeded.phase_artifact(GuidedPhase.PLANNING) is planning
+
+
 def test_guided_loop_compile_failure(sample_before_file: Path) -> None:
     diff = replacement_block("print('hello')", "print('patched')")
     client = StubLLMClient([
@@ -926,6 +1110,91 @@ def test_guided_loop_compile_failure(sample_before_file: Path) -> None:
     assert "compile/test failed" in first_iteration.history_entry
 
 
+def test_identical_patch_reuses_compile_result(sample_before_file: Path, tmp_path: Path) -> None:
+    diff = replacement_block("print('hello')", "print('patched')")
+    responses = []
+    for label in ("repeat-1", "repeat-2"):
+        responses.extend(
+            [
+                diagnosis_payload(label),
+                planning_payload(f"{label}-H1"),
+                gather_payload(),
+                proposal_payload(label),
+                diff,
+                "Compile still failing after patch.",
+            ]
+        )
+    counter = tmp_path / "compile-count.txt"
+    script = (
+        "import pathlib, sys; p = pathlib.Path(%r); "
+        "p.write_text(str(int(p.read_text() or 0) + 1) if p.exists() else '1'); sys.exit(1)"
+    ) % str(counter)
+    request = build_request(sample_before_file, [sys.executable, "-c", script])
+    strategy = GuidedConvergenceStrategy(
+        client=StubLLMClient(responses),
+        config=GuidedLoopConfig(
+            interpreter_model="test",
+            patch_model="test",
+            max_iterations=1,
+            refine_sub_iterations=0,
+            main_loop_passes=2,
+        ),
+    )
+
+    result = strategy.run(request)
+
+    critiques = [
+        phase
+        for iteration in result.trace.iterations
+        for phase in iteration.phases
+        if phase.phase == GuidedPhase.CRITIQUE
+    ]
+    assert [phase.machine_checks.get("compileCacheHit") for phase in critiques] == [False, True]
+    assert critiques[1].machine_checks["compile"]["returncode"] == 1
+    assert counter.read_text() == "1"
+
+
+def test_compile_output_limit_keeps_leading_diagnostics(sample_before_file: Path) -> None:
+    from llm_patch.strategies.guided_loop.compilation import run_compile
+
+    script = "import sys; sys.stderr.write('first error\\n' + 'x' * 100000); sys.exit(2)"
+    request = build_request(sample_before_file, [sys.executable, "-c", script])
+
+    result = run_compile(request, sample_before_file.read_text(encoding="utf-8"), output_limit=64)
+
+    assert result["returncode"] == 2
+    assert result["stderr"].startswith("first error\n")
+    assert result["stderr"].endswith("[... 99948 more bytes of output truncated]")
+    assert result["stdout"] == ""
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="needs a POSIX shell and process groups")
+@pytest.mark.parametrize("output_limit", [None, 1024])
+def test_compile_timeout_kills_background_children(
+    sample_before_file: Path, output_limit: int | None
+) -> None:
+    import time
+
+    from llm_patch.strategies.guided_loop.compilation import run_compile
+
+    # The background sleeper inherits the pipes; killing only the shell would
+    # leave the readers waiting for it.
+    request = build_request(sample_before_file, ["sh", "-c", "sleep 30 & echo started; sleep 30"])
+
+    began = time.monotonic()
+    result = run_compile(
+        request,
+        sample_before_file.read_text(encoding="utf-8"),
+        timeout=0.5,
+        output_limit=output_limit,
+    )
+
+    assert time.monotonic() - began < 10
+    assert result["returncode"] is None
+    assert result["stdout"] == "started\n"
+    assert result["stderr"].startswith("Compile command timed out after 0.5s")
+
+
 def test_guided_loop_multiple_iterations_succeed(sample_before_file: Path) -> None:
     bad_diff = replacement_block("print('nonexistent')", "print('still wrong')")
     good_diff = replacement_block("print('hello')", "print('refined')")
@@ -1141,4 +1410,67 @@ def test_second_main_loop_uses_full_critique_history(sample_before_file: Path) -
     diagnose_phase = next(
         phase for phase in second_loop.phases if phase.phase == GuidedPhase.DIAGNOSE
     )
-    assert first_critique in diagnose_phase.prompt
\ No newline at end of file
+    assert first_critique in diagnose_phase.prompt
+
+
+def test_merge_with_unchanged_local_skips_git(monkeypatch: pytest.MonkeyPatch) -> None:
+    from llm_patch.strategies.guided_loop import patching
+
+    monkeypatch.setattr(patching.shutil, "which", lambda name: None)
+    base = ["int a = 1;", "int b = 2;", ""]
+    target = ["int a = 1;", "int b = 3;", "int c = 4;", ""]
+
+    assert patching.merge_fragment_versions(base, list(base), target) == (
+        True,
+        ["int a = 1;", "int b = 3;", "int c = 4;"],
+        None,
+    )
+    local = ["int a = 1;", "int b = 5;", ""]
+    assert patching.merge_fragment_versions(base, local, list(base)) == (
+        True,
+        ["int a = 1;", "int b = 5;"],
+        None,
+    )
+    success, _, diagnostic = patching.merge_fragment_versions(base, ["changed"], target)
+    assert not success
+    assert diagnostic and "Git executable not found" in diagnostic
+
+
+def test_error_line_is_scanned_once_per_request_and_error_text():
+    from pathlib import Path
+
+    from llm_patch.strategies.guided_loop.models import GuidedLoopInputs
+
+    calls = []
+
+    def detect(error_text, filename):
+        calls.append((error_text, filename))
+        return 3
+
+    request = GuidedLoopInputs(
+        case_id="case",
+        language="java",
+        source_path=Path("Main.java"),
+        source_text="a\nb\nc\n",
+        error_text="Main.java:3: error",
+        manifest={},
+    )
+    assert request.error_line(detect, "Main.java") == 3
+    assert request.error_line(detect, "Main.java") == 3
+    request.error_text = "Main.java:2: error"
+    request.error_line(detect, "Main.java")
+    assert calls == [("Main.java:3: error", "Main.java"), ("Main.java:2: error", "Main.java")]
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["", "a", "a\n", "a\nb", "a\n\nb\n", "a\r\nb\rc\n", "a\fb c\x85", "\n\r\n\r"],
+)
+def test_source_view_line_starts_follow_splitlines(text: str) -> None:
+    from llm_patch.strategies.guided_loop.models import SourceView
+
+    view = SourceView.from_text(text)
+    assert view.line_count == len(text.splitlines())
+    assert [view.line_range(n, n) for n in range(1, view.line_count + 1)] == [
+        [line] for line in text.splitlines()
+    ]